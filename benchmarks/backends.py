@@ -0,0 +1,71 @@
+"""Compare the pools of funpy.pp on CPU-bound and payload-heavy workloads.
+
+Usage: python benchmarks/backends.py [items] [workers]
+"""
+
+import os
+import sys
+import time
+
+from funpy import pp
+
+
+def cpu(n: int) -> int:
+    """CPU-bound task: sum of squares in pure python."""
+    return sum(i * i for i in range(n))
+
+
+def payload(b: bytes) -> int:
+    """Payload-heavy task: cheap work on a large buffer."""
+    return len(b) + b[0]
+
+
+def backends() -> dict:
+    """Return the pools available on this interpreter by name."""
+    pools = dict(thread=pp.ThreadPool, process=pp.ProcessPool)
+
+    if pp.InterpreterPool is not None:
+        pools["interpreter"] = pp.InterpreterPool
+
+    return pools
+
+
+def bench(f, items: list, pool, workers: int, **kwargs) -> float:
+    """Return the seconds spent to pmap f on items with a warm pool."""
+    with pp.Session(pool, workers) as session:
+        start = time.perf_counter()
+        pp.it.consume(pp.pmap(f, items, pool=session, **kwargs))
+
+        return time.perf_counter() - start
+
+
+def main(items: int = 64, workers: int = None) -> None:
+    """Print the duration of each workload on each backend."""
+    workers = workers or os.cpu_count() or 1
+    blobs = [os.urandom(1 << 22)] * items
+    workloads = dict(
+        cpu=(cpu, [200_000] * items, {}),
+        payload=(payload, blobs, {}),
+        payload_shared=(payload, blobs, dict(shared=1 << 20)),
+    )
+
+    print("python {} (free-threaded: {})".format(sys.version, pp.freethreaded()))
+    print("auto: {}, workers: {}".format(pp.AutoPool.__name__, workers))
+
+    for name, (f, l, kwargs) in workloads.items():
+        for backend, pool in backends().items():
+            try:
+                seconds = "{:.3f}s".format(bench(f, l, pool, workers, **kwargs))
+            except Exception as error:
+                seconds = "error: {!r}".format(error)
+
+            print("{:<16}{:<14}{}".format(name, backend, seconds))
+
+    start = time.perf_counter()
+    pp.it.consume(map(cpu, [200_000] * items))
+    seconds = "{:.3f}s".format(time.perf_counter() - start)
+    print("{:<16}{:<14}{}".format("cpu", "sequential", seconds))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,73 @@
+"""Kill (or hang) a process-pool daemon while a Cluster maps tasks on it.
+
+The tasks of the lost daemon must be retried on the other one, and the
+map must complete in a few seconds (instead of hanging).
+
+Usage: python benchmarks/failover.py [kill|stop]
+"""
+
+import contextlib
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from funpy import pp
+
+AUTHKEY = b"failover"
+
+
+def slowneg(x: int) -> int:
+    """Task slow enough to be running when the daemon is killed."""
+    time.sleep(0.01)
+
+    return -x
+
+
+def daemon() -> None:
+    """Serve with a process pool and print the port on stdout."""
+
+    def ready(address: pp.Address) -> None:
+        print(address[1], flush=True)
+
+    pp.serve(("localhost", 0), AUTHKEY, 2, pp.ProcessPool, ready)
+
+
+def main(mode: str = "kill", items: int = 2000) -> None:
+    """Map on two daemons, kill (or stop) one of them midway, check results."""
+    sig = dict(kill=signal.SIGKILL, stop=signal.SIGSTOP)[mode]
+    command = [sys.executable, __file__, "daemon"]
+    daemons = [
+        subprocess.Popen(command, stdout=subprocess.PIPE, start_new_session=True)
+        for _ in range(2)
+    ]
+
+    try:
+        addresses = [("localhost", int(d.stdout.readline())) for d in daemons]
+        start = time.perf_counter()
+
+        with pp.Cluster(addresses, AUTHKEY, silence=3.0) as cluster:
+            results = []
+            mapped = pp.pmap(slowneg, range(items), pool=cluster, chunksize=10)
+
+            for i, x in enumerate(mapped):
+                results.append(x)
+
+                if i == items // 4:
+                    os.kill(daemons[0].pid, sig)
+
+        seconds = time.perf_counter() - start
+        status = "ok" if results == [-x for x in range(items)] else "wrong"
+        print("{}: {} results in {:.2f}s".format(status, len(results), seconds))
+    finally:
+        for d in daemons:  # kill the daemons with their pool workers
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(d.pid, signal.SIGKILL)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["daemon"]:
+        daemon()
+    else:
+        main(*sys.argv[1:])
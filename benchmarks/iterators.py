@@ -0,0 +1,42 @@
+"""Time the hot paths of funpy.it per element on large inputs.
+
+Usage: python benchmarks/iterators.py [items]
+"""
+
+import sys
+import time
+
+from funpy import it, op
+
+
+def workloads(n: int) -> dict:
+    """Return the functions to time on n items by name."""
+    m = {i: -i for i in range(0, 1000, 2)}
+    s = set(range(0, 1000, 3))
+
+    return dict(
+        mapevery=lambda: it.consume(it.mapevery(op.add, 3, range(n), range(n))),
+        replace=lambda: it.consume(it.replace((i % 1000 for i in range(n)), m)),
+        member=lambda: it.consume(it.member((i % 1000 for i in range(n)), s)),
+        locate=lambda: it.consume(it.locate(range(n), op.iseven)),
+        dropnth=lambda: it.consume(it.dropnth(range(n), 3)),
+        chunk=lambda: it.consume(it.chunk(range(n), 8)),
+        quantify=lambda: it.quantify(range(n), op.iseven),
+        consume=lambda: it.consume(iter(range(n))),
+        nth=lambda: it.nth(iter(range(n)), n - 1),
+        find=lambda: it.find(iter(range(n)), op.isneg),
+        len=lambda: it.len(iter(range(n))),
+    )
+
+
+def main(items: int = 10_000_000) -> None:
+    """Print the nanoseconds spent per item by each function."""
+    for name, f in workloads(items).items():
+        start = time.perf_counter()
+        f()
+        nanos = (time.perf_counter() - start) / items * 1e9
+        print("{:<12}{:>8.1f} ns/item".format(name, nanos))
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -1,8 +1,15 @@
 """Iterator library"""
 
+import array
 import builtins
+import collections
+import collections.abc
 import functools
+import heapq
 import itertools
+import math
+import pickle
+import tempfile
 
 # TYPES {{{
 from typing import Any, Callable, Container, Iterable, Iterator, Optional, Tuple
@@ -12,6 +19,56 @@ from funpy import fn, op
 # }}}
 # INITS {{{
 slice = itertools.islice
+# }}}
+# DISPATCHERS {{{
+def _sequence(l: Iterable) -> bool:
+    """Return True if l has a length and integer indexes (e.g. list, range).
+
+    >>> _sequence([]), _sequence(range(0)), _sequence(iter([]))
+    (True, True, False)
+    """
+    return isinstance(l, collections.abc.Sequence)
+
+
+def _sized(l: Iterable) -> bool:
+    """Return True if l knows its length without iteration (e.g. dict).
+
+    >>> _sized({}), _sized(iter({}))
+    (True, False)
+    """
+    return isinstance(l, collections.abc.Sized)
+
+
+def _size(l: Any) -> int:
+    """Return the length of a sized l, even above sys.maxsize (unlike len).
+
+    >>> _size(range(3)), _size(Space(product, range(10), repeat=20))
+    (3, 100000000000000000000)
+    """
+    try:
+        return builtins.len(l)
+    except OverflowError:  # __len__ of a python class may return any int
+        return type(l).__len__(l)
+
+
+def _reversible(l: Iterable) -> bool:
+    """Return True if l can be iterated backward (e.g. dict, deque).
+
+    >>> _reversible(collections.deque()), _reversible(iter([]))
+    (True, False)
+    """
+    return isinstance(l, collections.abc.Reversible)
+
+
+def _hashed(l: Iterable) -> bool:
+    """Return True if l checks membership by hash (e.g. set, dict).
+
+    >>> _hashed(set()), _hashed({}), _hashed([])
+    (True, True, False)
+    """
+    return isinstance(l, (collections.abc.Set, collections.abc.Mapping))
+
+
 # }}}
 # MAPPING {{{
 map = builtins.map
@@ -40,11 +97,18 @@ def mapevery(f: Callable, n: int, *ls: Iterable) -> Iterator:
     """
     assert n > 0, "n must be greater than 0"
 
-    for i, x in enumerate(zip(*ls)):
-        if i % n == 0:
-            yield f(*x)
-        else:
-            yield tuple(x)
+    if n == 1:
+        return starmap(f, zip(*ls))
+
+    return _mapevery(f, n, zip(*ls))
+
+
+def _mapevery(f: Callable, n: int, xs: Iterator[tuple]) -> Iterator:
+    """Apply f on the first x of every n items of xs."""
+    calls = cycle((True,) + (False,) * (n - 1))
+
+    for call, x in zip(calls, xs):
+        yield f(*x) if call else x
 
 
 def replace(l: Iterable, m: dict, d: Any = None) -> Iterator:
@@ -54,8 +118,7 @@ def replace(l: Iterable, m: dict, d: Any = None) -> Iterator:
     >>> list(replace(('a',  'b', 'c', 'b', 'd'), mapping))
     [1, 2, None, 2, None]
     """
-    for x in l:
-        yield m.get(x, d)
+    return map(m.get, l, repeat(d))
 
 
 # }}}
@@ -63,6 +126,78 @@ def replace(l: Iterable, m: dict, d: Any = None) -> Iterator:
 sorted = builtins.sorted
 
 reversed = builtins.reversed
+
+
+def topk(l: Iterable, k: int, key: Callable = None) -> list:
+    """Return the k largest items of l with a heap of size k.
+
+    >>> topk((3, 1, 4, 1, 5, 9, 2, 6), 3)
+    [9, 6, 5]
+    """
+    return heapq.nlargest(k, l, key=key)
+
+
+def bottomk(l: Iterable, k: int, key: Callable = None) -> list:
+    """Return the k smallest items of l with a heap of size k.
+
+    >>> bottomk(('bb', 'a', 'ccc', 'dd'), 2, key=len)
+    ['a', 'bb']
+    """
+    return heapq.nsmallest(k, l, key=key)
+
+
+def extsorted(
+    l: Iterable,
+    key: Callable = None,
+    reverse: bool = False,
+    budget: int = 1_000_000,
+    batch: int = 1024,
+) -> Iterator:
+    """Sort l out of core: at most budget items are sorted in memory.
+
+    Sorted runs of budget items are written to temporary files by batches,
+    then merged lazily (the sort is stable, like sorted).
+
+    >>> list(extsorted((3, 1, 4, 1, 5, 9, 2, 6), budget=3))
+    [1, 1, 2, 3, 4, 5, 6, 9]
+    >>> list(extsorted(('bb', 'a', 'ccc', 'dd'), key=len, reverse=True, budget=2))
+    ['ccc', 'bb', 'dd', 'a']
+    """
+    assert budget > 0, "budget must be greater than 0"
+    assert batch > 0, "batch must be greater than 0"
+
+    runs: list = []
+    l = iter(l)
+
+    try:
+        while True:
+            run = sorted(slice(l, budget), key=key, reverse=reverse)
+
+            if not runs and builtins.len(run) < budget:
+                yield from run  # the input fits in memory
+
+                return
+
+            if not run:
+                break
+
+            spill = tempfile.TemporaryFile()
+            runs.append(spill)
+
+            for items in chunkall(run, batch):
+                pickle.dump(items, spill, pickle.HIGHEST_PROTOCOL)
+
+            del run
+            spill.seek(0)
+
+        loads = (concat(_load(spill)) for spill in runs)
+
+        yield from heapq.merge(*loads, key=key, reverse=reverse)
+    finally:
+        for spill in runs:
+            spill.close()
+
+
 # }}}
 # GROUPING {{{
 groupby = itertools.groupby
@@ -76,62 +211,196 @@ def slide(l: Iterable, n: int) -> Iterator[tuple]:
     >>> list(slide(range(2), 3))
     []
     """
+    if n <= 0:
+        return
 
-    def window(x):
-        i, slided = x
-
-        return drop(slided, i)
+    window: collections.deque = collections.deque(maxlen=n)
 
-    slides = tee(l, n)
-    windows = map(window, enumerate(slides))
+    for x in l:
+        window.append(x)
 
-    return zip(*windows)
+        if builtins.len(window) == n:
+            yield tuple(window)
 
 
-def split(l: Iterable, n: int) -> Tuple[Iterator, Iterator]:
-    """Split l based on n.
+def split(
+    l: Iterable, n: int, buffersize: int = None, overflow: str = "raise"
+) -> Tuple[Iterator, Iterator]:
+    """Split l based on n (see partitionby for buffersize and overflow).
 
     >>> list(map(list, split(range(5), 2)))
     [[0, 1], [2, 3, 4]]
     >>> list(map(list, split(range(1), 2)))
     [[0], []]
     """
-    left, right = tee(l)
+    assert n >= 0, "n must be greater or equals to 0"
 
-    return take(left, n), drop(right, n)
+    index = count()
+    left, right = partitionby(
+        l, lambda _: next(index) >= n, 2, buffersize, overflow
+    )
 
+    return take(left, n), right
 
-def splitby(l: Iterable, p: fn.Predicate = bool) -> Tuple[Iterator, Iterator]:
-    """Split l based on p.
+
+def splitby(
+    l: Iterable, p: fn.Predicate = bool, buffersize: int = None, overflow: str = "raise"
+) -> Tuple[Iterator, Iterator]:
+    """Split l based on p (see partitionby for buffersize and overflow).
 
     >>> list(map(list, splitby(range(5), op.iseven)))
     [[1, 3], [0, 2, 4]]
     >>> list(map(list, splitby(range(1), op.iseven)))
     [[], [0]]
     """
-    left, right = tee(l)
+    left, right = partitionby(l, fn.compose(p, op.istrue), 2, buffersize, overflow)
+
+    return left, right
+
+
+def partitionby(
+    l: Iterable, f: Callable, n: int, buffersize: int = None, overflow: str = "raise"
+) -> Tuple[Iterator, ...]:
+    """Partition l in n iterators based on the index returned by f.
+
+    f is called once per item, in order. Items pulled from l for another
+    partition wait in its buffer of buffersize items (None: unbounded).
+    When a buffer is full, the overflow policy either raises an
+    OverflowError or spills the next items to a temporary file.
+
+    >>> zeros, ones, twos = partitionby(range(7), lambda x: x % 3, 3)
+    >>> list(ones), list(zeros)
+    ([1, 4], [0, 3, 6])
+    >>> evens, odds = partitionby(range(9), op.isodd, 2, buffersize=2)
+    >>> list(odds)
+    Traceback (most recent call last):
+     ...
+    OverflowError: the buffer of partition 0 is full
+    >>> evens, odds = partitionby(range(9), op.isodd, 2, 2, 'spill')
+    >>> list(odds), list(evens)
+    ([1, 3, 5, 7], [0, 2, 4, 6, 8])
+    """
+    assert n > 0, "n must be greater than 0"
+    assert buffersize is None or buffersize > 0, "buffersize must be greater than 0"
+    assert overflow in ("raise", "spill"), "overflow must be raise or spill"
+
+    partitions = _Partitions(l, f, n, buffersize, overflow)
+
+    return tuple(partitions.partition(i) for i in range(n))
+
+
+class _Partitions:
+    """Shared state of the partitions of an iterable."""
+
+    def __init__(self, l, f, n, buffersize, overflow):
+        self.l = iter(l)
+        self.f = f
+        self.buffersize = buffersize
+        self.overflow = overflow
+        self.buffers = [collections.deque() for _ in range(n)]
+        # items spilled to disk by batches, then the batch not yet written
+        self.spills: list = [None] * n
+        self.reads = [0] * n
+        self.pending = [0] * n
+        self.tails: list = [[] for _ in range(n)]
+        self.closed: set = set()
+
+    def partition(self, i: int) -> Iterator:
+        """Yield the items of the partition i."""
+        buffer = self.buffers[i]
+
+        try:
+            while True:
+                if buffer:
+                    yield buffer.popleft()
+                elif self.pending[i]:
+                    buffer.extend(self._unspill(i))
+                elif self.tails[i]:
+                    buffer.extend(self.tails[i])
+                    self.tails[i].clear()
+                else:
+                    for x in self.l:
+                        j = self.f(x)
+
+                        if j == i:
+                            yield x
+                            break
+
+                        self._push(j, x)
+                    else:
+                        return
+        finally:
+            # the items of a closed partition are dropped from now on
+            self.closed.add(i)
+            buffer.clear()
+            self.tails[i].clear()
+
+            if self.spills[i] is not None:
+                self.spills[i].close()
+
+    def _push(self, i: int, x: Any) -> None:
+        """Buffer an item of the partition i, or apply the overflow policy."""
+        if i in self.closed:
+            return
+
+        buffer, tail = self.buffers[i], self.tails[i]
+        spilling = self.pending[i] or tail
+
+        if self.buffersize is None or (
+            not spilling and builtins.len(buffer) < self.buffersize
+        ):
+            buffer.append(x)
+        elif self.overflow == "raise":
+            raise OverflowError("the buffer of partition {:d} is full".format(i))
+        else:
+            tail.append(x)
+
+            if builtins.len(tail) >= self.buffersize:
+                self._spill(i)
 
-    return remove(p, left), filter(p, right)
+    def _spill(self, i: int) -> None:
+        """Append the tail of the partition i to its temporary file."""
+        if self.spills[i] is None:
+            self.spills[i] = tempfile.TemporaryFile()
 
+        spill = self.spills[i]
+        spill.seek(0, 2)
+        pickle.dump(self.tails[i], spill, pickle.HIGHEST_PROTOCOL)
+        self.tails[i].clear()
+        self.pending[i] += 1
 
-def chunk(l: Iterable, n: int) -> Iterator[tuple]:
+    def _unspill(self, i: int) -> list:
+        """Read the next batch of the partition i from its temporary file."""
+        spill = self.spills[i]
+        spill.seek(self.reads[i])
+        batch = pickle.load(spill)
+        self.reads[i] = spill.tell()
+        self.pending[i] -= 1
+
+        return batch
+
+
+def chunk(l: Iterable, n: int, view: bool = False) -> Iterator:
     """Create chunks of size n from l.
 
+    With view, sequences are chunked by slices and binary buffers (bytes,
+    bytearray, memoryview, array) by memoryviews, without per-item work.
+
     >>> list(map(list, chunk(range(8), 3)))
     [[0, 1, 2], [3, 4, 5]]
     >>> list(map(list, chunk(range(2), 3)))
     []
+    >>> list(chunk([0, 1, 2, 3, 4], 2, view=True))
+    [[0, 1], [2, 3]]
+    >>> list(map(bytes, chunk(b'abcdefg', 3, view=True)))
+    [b'abc', b'def']
     """
     assert n > 0, "n must be greater than 0"
 
-    chunking: list = []
-
-    for i, x in enumerate(l, 1):
-        chunking.append(x)
+    if view and _viewable(l):
+        return _views(l, n, False)
 
-        if i % n == 0:
-            yield tuple(chunking)
-            chunking.clear()
+    return zip(*[iter(l)] * n)
 
 
 def chunkby(l: Iterable, p: fn.Predicate = bool) -> Iterator[tuple]:
@@ -144,8 +413,8 @@ def chunkby(l: Iterable, p: fn.Predicate = bool) -> Iterator[tuple]:
         yield tuple(items)
 
 
-def chunkall(l: Iterable, n: int) -> Iterator[tuple]:
-    """Create chunks of size n at least from l.
+def chunkall(l: Iterable, n: int, view: bool = False) -> Iterator:
+    """Create chunks of size n at least from l (see chunk for view).
 
     >>> list(map(list, chunkall(range(2), 3)))
     [[0, 1]]
@@ -153,9 +422,21 @@ def chunkall(l: Iterable, n: int) -> Iterator[tuple]:
     [[0, 1, 2], [3, 4, 5], [6, 7]]
     >>> list(map(list, chunkall(range(9), 3)))
     [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+    >>> list(chunkall('abcdefg', 3, view=True))
+    ['abc', 'def', 'g']
+    >>> [v.tolist() for v in chunkall(array.array('i', range(5)), 2, view=True)]
+    [[0, 1], [2, 3], [4]]
     """
     assert n > 0, "n must be greater than 0"
 
+    if view and _viewable(l):
+        return _views(l, n, True)
+
+    return _chunkall(l, n)
+
+
+def _chunkall(l: Iterable, n: int) -> Iterator[tuple]:
+    """Create tuples of size n at least from l."""
     chunking: list = []
 
     for i, x in enumerate(l, 1):
@@ -169,40 +450,395 @@ def chunkall(l: Iterable, n: int) -> Iterator[tuple]:
         yield tuple(chunking)
 
 
-def grouped(l: Iterable, f: Callable = fn.ident) -> Iterator[Tuple[Any, tuple]]:
+def _viewable(l: Iterable) -> bool:
+    """Return True if l can be chunked by slices or views."""
+    return isinstance(l, _BUFFERS) or _sequence(l)
+
+
+_BUFFERS = (bytes, bytearray, memoryview, array.array)
+
+
+def _views(l: Any, n: int, rest: bool) -> Iterator:
+    """Slice l in chunks of size n (with the rest or not)."""
+    if isinstance(l, _BUFFERS):
+        l = memoryview(l)
+
+    size = _size(l)
+    stop = size if rest else size - size % n
+    slices = map(builtins.slice, range(0, stop, n), count(n, n))
+
+    return map(l.__getitem__, slices)
+
+
+def chunkinto(l: Any, buffer: bytearray) -> Iterator[memoryview]:
+    """Fill buffer from a binary stream and yield a view of each record.
+
+    l is a binary file (read with readinto) or an iterable of bytes-like
+    blocks. The same buffer is reused: a view is only valid until the next
+    record is read. The last record may be shorter than the buffer.
+
+    >>> buffer = bytearray(3)
+    >>> [bytes(v) for v in chunkinto((b'ab', b'cdef', b'g'), buffer)]
+    [b'abc', b'def', b'g']
+    >>> import io
+    >>> [bytes(v) for v in chunkinto(io.BytesIO(b'abcdefg'), buffer)]
+    [b'abc', b'def', b'g']
+    """
+    assert builtins.len(buffer) > 0, "buffer must not be empty"
+
+    view = memoryview(buffer)
+    size = builtins.len(view)
+    filled = 0
+
+    if hasattr(l, "readinto"):
+        while True:
+            n = l.readinto(view[filled:])
+
+            if not n:
+                break
+
+            filled += n
+
+            if filled == size:
+                yield view
+                filled = 0
+    else:
+        for block in l:
+            block = memoryview(block).cast("B")
+            start = 0
+
+            while start < builtins.len(block):
+                n = builtins.min(size - filled, builtins.len(block) - start)
+                view[filled : filled + n] = block[start : start + n]
+                filled += n
+                start += n
+
+                if filled == size:
+                    yield view
+                    filled = 0
+
+    if filled:
+        yield view[:filled]
+
+
+def grouped(
+    l: Iterable, f: Callable = fn.ident, budget: int = None, partitions: int = 16
+) -> Iterator[Tuple[Any, tuple]]:
     """Group items of l based on f.
 
+    With a budget, at most budget items are held in memory: the overflow is
+    hash-partitioned to temporary files, then each partition is grouped in
+    turn (keys are yielded by partition instead of by first appearance).
+
     >>> list(grouped((1, 2, 3, 1, 2, 3, 1, 2)))
     [(1, (1, 1, 1)), (2, (2, 2, 2)), (3, (3, 3))]
     >>> list(grouped(({'a': 1}, {'a': 2}, {'a': 1}), op.getit('a')))
     [(1, ({'a': 1}, {'a': 1})), (2, ({'a': 2},))]
+    >>> builtins.sorted(grouped((1, 2, 3, 1, 2, 3, 1, 2), budget=2))
+    [(1, (1, 1, 1)), (2, (2, 2, 2)), (3, (3, 3))]
+    """
+    return _group(((f(x), x) for x in l), budget, partitions)
+
+
+def groupkv(
+    l: Iterable, budget: int = None, partitions: int = 16
+) -> Iterator[Tuple[Any, tuple]]:
+    """Group key value items of l based on key (see grouped for budget).
+
+    >>> list(groupkv(((0, 0), (1, 1), (0, 2), (1, 3))))
+    [(0, (0, 2)), (1, (1, 3))]
+    >>> builtins.sorted(groupkv(((0, 0), (1, 1), (0, 2), (1, 3)), budget=1))
+    [(0, (0, 2)), (1, (1, 3))]
+    """
+    return _group(l, budget, partitions)
+
+
+def _group(
+    kvs: Iterable[tuple], budget: Optional[int], partitions: int, salt: int = 0
+) -> Iterator[Tuple[Any, tuple]]:
+    """Group key value items in memory, or spill them under a budget."""
+    assert budget is None or budget > 0, "budget must be greater than 0"
+    assert partitions > 1, "partitions must be greater than 1"
+
+    index: dict = {}
+    spills: list = []
+    size = 0
+
+    try:
+        for k, v in kvs:
+            index.setdefault(k, []).append(v)
+            size += 1
+
+            if budget is not None and size > budget:
+                if not spills:
+                    spills = [tempfile.TemporaryFile() for _ in range(partitions)]
+
+                _spill(index, spills, salt)
+                index.clear()
+                size = 0
+
+        if not spills:
+            for k, vs in index.items():
+                yield k, tuple(vs)
+
+            return
+
+        _spill(index, spills, salt)
+        index.clear()
+
+        # a partition with too many items is split again with a new salt,
+        # except after a few levels (e.g. a single key above the budget).
+        budget = budget if salt < 3 else None
+
+        for spill in spills:
+            spill.seek(0)
+
+            yield from _group(_unspill(spill), budget, partitions, salt + 1)
+    finally:
+        for spill in spills:
+            spill.close()
+
+
+def _spill(index: dict, spills: list, salt: int) -> None:
+    """Append the groups of index to their partition files."""
+    batches: list = [[] for _ in spills]
+
+    for k, vs in index.items():
+        batches[hash((salt, k)) % builtins.len(spills)].append((k, vs))
+
+    for spill, batch in zip(spills, batches):
+        if batch:
+            pickle.dump(batch, spill, pickle.HIGHEST_PROTOCOL)
+
+
+def _unspill(spill) -> Iterator[tuple]:
+    """Yield the key value items of a partition file."""
+    for batch in _load(spill):
+        for k, vs in batch:
+            for v in vs:
+                yield k, v
+
+
+def _load(spill) -> Iterator:
+    """Yield the objects pickled in a temporary file."""
+    while True:
+        try:
+            yield pickle.load(spill)
+        except EOFError:
+            return
+
+
+# }}}
+# JOINS {{{
+_HOWS = ("inner", "left", "right", "outer")
+
+
+def join(
+    l: Iterable,
+    r: Iterable,
+    f: Callable = fn.ident,
+    g: Callable = None,
+    how: str = "inner",
+    d: Any = None,
+) -> Iterator[tuple]:
+    """Hash join the items of l and r on their keys f(x) and g(y).
+
+    Yield (k, x, y) for each matching pair, and (k, x, d) or (k, d, y) for
+    the unmatched items kept by a left, right or outer join. The smaller
+    side (when both are sized, r otherwise) is indexed in memory while the
+    other one is streamed, which decides the order of the pairs.
+
+    >>> list(join(('a', 'bb', 'cc'), (1, 2, 2, 3), len, fn.ident))
+    [(1, 'a', 1), (2, 'bb', 2), (2, 'cc', 2), (2, 'bb', 2), (2, 'cc', 2)]
+    >>> list(join(range(3), 'ab', g=lambda y: ord(y) - 97, how='left'))
+    [(0, 0, 'a'), (1, 1, 'b'), (2, 2, None)]
+    >>> builtins.sorted(join('ab', 'bc', how='outer', d=''))
+    [('a', 'a', ''), ('b', 'b', 'b'), ('c', '', 'c')]
     """
+    assert how in _HOWS, "how must be inner, left, right or outer"
+
+    g = g or f
+    keepl, keepr = how in ("left", "outer"), how in ("right", "outer")
+
+    if _sized(l) and _sized(r) and builtins.len(l) < builtins.len(r):  # type: ignore
+        pairs = _hashjoin(r, l, g, f, keepr, keepl, d)
+
+        return ((k, x, y) for k, y, x in pairs)
+
+    return _hashjoin(l, r, f, g, keepl, keepr, d)
+
+
+def _hashjoin(
+    l: Iterable,
+    r: Iterable,
+    f: Callable,
+    g: Callable,
+    keepl: bool,
+    keepr: bool,
+    d: Any,
+) -> Iterator[tuple]:
+    """Index r by g then stream l (keep the unmatched items or not)."""
     index: dict = {}
+    matched: set = set()
+
+    for y in r:
+        index.setdefault(g(y), []).append(y)
 
     for x in l:
         k = f(x)
+        ys = index.get(k)
 
-        index.setdefault(k, [])
-        index[k].append(x)
+        if ys is None:
+            if keepl:
+                yield k, x, d
 
-    for k, vs in index.items():
-        yield k, tuple(vs)
+            continue
 
+        if keepr:
+            matched.add(k)
 
-def groupkv(l: Iterable):
-    """Group key value items of l based on key.
+        for y in ys:
+            yield k, x, y
 
-    >>> list(groupkv(((0, 0), (1, 1), (0, 2), (1, 3))))
-    [(0, (0, 2)), (1, (1, 3))]
+    if keepr:
+        for k, ys in index.items():
+            if k not in matched:
+                for y in ys:
+                    yield k, d, y
+
+
+def mergejoin(
+    l: Iterable,
+    r: Iterable,
+    f: Callable = fn.ident,
+    g: Callable = None,
+    how: str = "inner",
+    d: Any = None,
+) -> Iterator[tuple]:
+    """Sort-merge join l and r already sorted by their keys (see join).
+
+    Only the items of r sharing the current key are held in memory.
+
+    >>> list(mergejoin(('a', 'bb', 'cc'), (1, 2, 2, 3), len, fn.ident))
+    [(1, 'a', 1), (2, 'bb', 2), (2, 'bb', 2), (2, 'cc', 2), (2, 'cc', 2)]
+    >>> list(mergejoin('ab', 'bc', how='outer', d=''))
+    [('a', 'a', ''), ('b', 'b', 'b'), ('c', '', 'c')]
+    """
+    assert how in _HOWS, "how must be inner, left, right or outer"
+
+    keepl, keepr = how in ("left", "outer"), how in ("right", "outer")
+
+    for k, xs, ys in _cogroups(l, r, f, g or f):
+        if xs is None:
+            if keepr:
+                yield from ((k, d, y) for y in ys)
+        elif ys is None:
+            if keepl:
+                yield from ((k, x, d) for x in xs)
+        else:
+            ys = tuple(ys)
+
+            for x in xs:
+                for y in ys:
+                    yield k, x, y
+
+
+def _cogroups(l: Iterable, r: Iterable, f: Callable, g: Callable) -> Iterator[tuple]:
+    """Yield (k, xs, ys) from l and r sorted by key (None if no group)."""
+    missing = object()
+    lgroups, rgroups = groupby(l, f), groupby(r, g)
+    lk, xs = next(lgroups, (missing, None))
+    rk, ys = next(rgroups, (missing, None))
+
+    while lk is not missing or rk is not missing:
+        if rk is missing or (lk is not missing and lk < rk):
+            yield lk, xs, None
+            lk, xs = next(lgroups, (missing, None))
+        elif lk is missing or rk < lk:
+            yield rk, None, ys
+            rk, ys = next(rgroups, (missing, None))
+        else:
+            yield lk, xs, ys
+            lk, xs = next(lgroups, (missing, None))
+            rk, ys = next(rgroups, (missing, None))
+
+
+def cogroup(
+    l: Iterable, r: Iterable, f: Callable = fn.ident, g: Callable = None
+) -> Iterator[Tuple[Any, tuple, tuple]]:
+    """Group the items of l and r by their keys f(x) and g(y).
+
+    Yield (k, xs, ys) for each key of l or r, by first appearance.
+
+    >>> list(cogroup((1, 2, 3, 1), (3, 4, 3)))
+    [(1, (1, 1), ()), (2, (2,), ()), (3, (3,), (3, 3)), (4, (), (4,))]
+    >>> list(cogroup(range(5), 'ab', op.iseven, lambda y: y == 'a'))
+    [(True, (0, 2, 4), ('a',)), (False, (1, 3), ('b',))]
     """
     index: dict = {}
+    g = g or f
 
-    for k, v in l:
-        index.setdefault(k, [])
-        index[k].append(v)
+    for x in l:
+        index.setdefault(f(x), ([], []))[0].append(x)
 
-    for k, vs in index.items():
-        yield k, tuple(vs)
+    for y in r:
+        index.setdefault(g(y), ([], []))[1].append(y)
+
+    for k, (xs, ys) in index.items():
+        yield k, tuple(xs), tuple(ys)
+
+
+# }}}
+# SETS {{{
+merge = heapq.merge
+
+
+def union(l: Iterable, r: Iterable, f: Callable = fn.ident) -> Iterator:
+    """Yield the items of l or r, both sorted by f (once per key).
+
+    Like the other set operations on sorted inputs, it runs in linear time
+    and holds no more than one item of each input.
+
+    >>> list(union((1, 3, 3, 5), (2, 3, 6)))
+    [1, 2, 3, 5, 6]
+    """
+    for _, xs, ys in _cogroups(l, r, f, f):
+        yield next(xs if xs is not None else ys)
+
+
+def intersection(l: Iterable, r: Iterable, f: Callable = fn.ident) -> Iterator:
+    """Yield the items of l whose key is in r, both sorted by f.
+
+    >>> list(intersection((1, 3, 3, 5), (2, 3, 6)))
+    [3]
+    >>> list(intersection(('a', 'bb', 'ccc'), ('xx', 'yyy'), len))
+    ['bb', 'ccc']
+    """
+    for _, xs, ys in _cogroups(l, r, f, f):
+        if xs is not None and ys is not None:
+            yield next(xs)
+
+
+def difference(l: Iterable, r: Iterable, f: Callable = fn.ident) -> Iterator:
+    """Yield the items of l whose key is not in r, both sorted by f.
+
+    >>> list(difference((1, 3, 3, 5), (2, 3, 6)))
+    [1, 5]
+    """
+    for _, xs, ys in _cogroups(l, r, f, f):
+        if ys is None:
+            yield next(xs)
+
+
+def symdifference(l: Iterable, r: Iterable, f: Callable = fn.ident) -> Iterator:
+    """Yield the items whose key is in l or r but not both, sorted by f.
+
+    >>> list(symdifference((1, 3, 3, 5), (2, 3, 6)))
+    [1, 2, 5, 6]
+    """
+    for _, xs, ys in _cogroups(l, r, f, f):
+        if xs is None or ys is None:
+            yield next(xs if xs is not None else ys)
 
 
 # }}}
@@ -224,20 +860,16 @@ def member(l: Iterable, s: Container) -> Iterator:
     >>> list(member(range(5), {1, 3, 5, 7}))
     [1, 3]
     """
-    for x in l:
-        if x in s:
-            yield x
+    return filter(functools.partial(op.isin, s), l)
 
 
-def locate(l: Iterable, p: fn.Predicate = bool):
+def locate(l: Iterable, p: fn.Predicate = bool) -> Iterator[int]:
     """Return l index when p is True.
 
     >>> list(locate(range(5), lambda x: x % 2 == 0))
     [0, 2, 4]
     """
-    for i, x in enumerate(l):
-        if p(x):
-            yield i
+    return compress(count(), map(p, l))
 
 
 def dedupe(l: Iterable, f: Callable = fn.ident) -> Iterator:
@@ -258,16 +890,110 @@ def dedupe(l: Iterable, f: Callable = fn.ident) -> Iterator:
             yield x
 
 
-def distinct(l: Iterable, f: Callable = fn.ident) -> Iterator:
+class Bloom:
+    """Set of fixed size answering membership with a false positive rate.
+
+    The number of bits and hashes derive from the expected capacity and
+    error rate (the error grows once more than capacity keys were added).
+
+    >>> [Bloom(1_000_000, error).nbytes for error in (0.1, 0.01, 0.001)]
+    [599067, 1198133, 1797199]
+    >>> b = Bloom(100)
+    >>> b.add('a')
+    >>> 'a' in b, 'b' in b
+    (True, False)
+    """
+
+    def __init__(self, capacity: int, error: float = 0.01):
+        assert capacity > 0, "capacity must be greater than 0"
+        assert 0 < error < 1, "error must be between 0 and 1"
+
+        bits = math.ceil(-capacity * math.log(error) / math.log(2) ** 2)
+        self.hashes = builtins.max(round(bits / capacity * math.log(2)), 1)
+        self.bits = bytearray((bits + 7) // 8)
+        self.size = builtins.len(self.bits) * 8
+        self.count = 0
+
+    def __contains__(self, x: Any) -> bool:
+        return all(self.bits[i >> 3] & (1 << (i & 7)) for i in self._indexes(x))
+
+    @staticmethod
+    def _mix(h: int) -> int:
+        """Scramble the bits of a 64 bits hash (splitmix64 finalizer)."""
+        h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+        h = (h ^ (h >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+
+        return h ^ (h >> 31)
+
+    def _indexes(self, x: Any) -> Iterator[int]:
+        """Derive the bit indexes of x from two hashes."""
+        h1 = self._mix(hash(x) & 0xFFFFFFFFFFFFFFFF)
+        h2 = self._mix(h1) | 1
+
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the bit array in bytes."""
+        return builtins.len(self.bits)
+
+    @property
+    def error(self) -> float:
+        """Return the expected false positive rate for the keys added."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def add(self, x: Any) -> None:
+        """Set the bits of x."""
+        for i in self._indexes(x):
+            self.bits[i >> 3] |= 1 << (i & 7)
+
+        self.count += 1
+
+
+def distinct(
+    l: Iterable,
+    f: Callable = fn.ident,
+    mode: str = "set",
+    size: int = None,
+    error: float = 0.01,
+) -> Iterator:
     """Return distinct items from l based on f.
 
+    The mode bounds the memory used to remember the keys seen:
+    - set: exact, remember every key (unbounded memory).
+    - window: exact within the keys of the last size items.
+    - lru: exact within the last size distinct keys seen (refreshed on hit).
+    - bloom: approximate, a Bloom filter for size keys drops some new items
+      with a false positive rate of error.
+
     >>> list(distinct((0, 0, 2, 1, 1, 3)))
     [0, 2, 1, 3]
     >>> list(distinct((0, 0, 2, 1, 1, 3), op.iseven))
     [0, 1]
+    >>> list(distinct((0, 1, 0, 2, 0, 3, 1), mode='window', size=2))
+    [0, 1, 2, 3, 1]
+    >>> list(distinct((0, 1, 0, 2, 0, 3, 1), mode='lru', size=2))
+    [0, 1, 2, 3, 1]
+    >>> list(distinct((0, 0, 2, 1, 1, 3), mode='bloom', size=100))
+    [0, 2, 1, 3]
     """
-    seen: set = set()
+    assert mode in ("set", "window", "lru", "bloom"), "mode is not supported"
+    assert mode == "set" or size is not None, "size is required by the mode"
+    assert size is None or size > 0, "size must be greater than 0"
+
+    if mode == "window":
+        return _distinctwindow(l, f, size)  # type: ignore
 
+    if mode == "lru":
+        return _distinctlru(l, f, size)  # type: ignore
+
+    seen = Bloom(size, error) if mode == "bloom" else set()  # type: ignore
+
+    return _distinctseen(l, f, seen)
+
+
+def _distinctseen(l: Iterable, f: Callable, seen: Any) -> Iterator:
+    """Yield the items whose key is not in seen (set or Bloom)."""
     for x in l:
         y = f(x)
 
@@ -276,6 +1002,46 @@ def distinct(l: Iterable, f: Callable = fn.ident) -> Iterator:
             yield x
 
 
+def _distinctwindow(l: Iterable, f: Callable, n: int) -> Iterator:
+    """Yield the items whose key is not in the keys of the last n items."""
+    window: collections.deque = collections.deque()
+    counts: dict = {}
+
+    for x in l:
+        y = f(x)
+
+        if y not in counts:
+            yield x
+
+        counts[y] = counts.get(y, 0) + 1
+        window.append(y)
+
+        if builtins.len(window) > n:
+            old = window.popleft()
+            counts[old] -= 1
+
+            if counts[old] == 0:
+                del counts[old]
+
+
+def _distinctlru(l: Iterable, f: Callable, n: int) -> Iterator:
+    """Yield the items whose key is not in the last n distinct keys."""
+    recents: collections.OrderedDict = collections.OrderedDict()
+
+    for x in l:
+        y = f(x)
+
+        if y in recents:
+            recents.move_to_end(y)
+            continue
+
+        yield x
+        recents[y] = None
+
+        if builtins.len(recents) > n:
+            recents.popitem(last=False)
+
+
 # }}}
 # REDUCTIONS {{{
 all = builtins.all
@@ -293,13 +1059,18 @@ def len(l: Iterable) -> int:
 
     >>> len(range(5))
     5
+    >>> len(x for x in range(5))
+    5
+    >>> len(iter(()))
+    0
     """
-    i = None
+    if _sized(l):
+        return _size(l)
 
-    for i, _ in enumerate(l, 1):
-        pass
+    counter = count()
+    consume(zip(l, counter))
 
-    return i
+    return next(counter)
 
 
 def mult(l: Iterable, start: Any = 1) -> Any:
@@ -320,7 +1091,17 @@ def contains(l: Iterable, x: Any) -> bool:
     True
     >>> contains(range(2), 3)
     False
+    >>> contains({'a': 1}, 'a'), contains('abc', 'ab')
+    (True, False)
     """
+    if _hashed(l):
+        try:
+            return x in l
+        except TypeError:  # unhashable x: compare with every item
+            pass
+    elif _sequence(l) and not isinstance(l, (str, bytes, bytearray)):
+        return x in l
+
     return any(x == z for z in l)
 
 
@@ -343,8 +1124,79 @@ def consume(l: Iterable) -> None:
     >>> consume(range(0)) is None
     True
     """
-    for _ in l:
-        pass
+    collections.deque(l, maxlen=0)
+
+
+# }}}
+# ROLLINGS {{{
+def rollsum(l: Iterable, n: int) -> Iterator:
+    """Return the sums of the slides of size n from l (O(1) per item).
+
+    >>> list(rollsum(range(5), 3))
+    [3, 6, 9]
+    >>> list(rollsum(range(2), 3))
+    []
+    """
+    assert n > 0, "n must be greater than 0"
+
+    window: collections.deque = collections.deque()
+    total = 0
+
+    for x in l:
+        window.append(x)
+        total += x
+
+        if builtins.len(window) > n:
+            total -= window.popleft()
+
+        if builtins.len(window) == n:
+            yield total
+
+
+def rollmean(l: Iterable, n: int) -> Iterator:
+    """Return the means of the slides of size n from l (O(1) per item).
+
+    >>> list(rollmean(range(5), 2))
+    [0.5, 1.5, 2.5, 3.5]
+    """
+    return map(op.truediv, rollsum(l, n), repeat(n))
+
+
+def _rollbest(l: Iterable, n: int, worse: Callable) -> Iterator:
+    """Return the best items of the slides of size n from l (monotonic deque)."""
+    assert n > 0, "n must be greater than 0"
+
+    bests: collections.deque = collections.deque()
+
+    for i, x in enumerate(l):
+        while bests and worse(bests[-1][1], x):
+            bests.pop()
+
+        bests.append((i, x))
+
+        if bests[0][0] <= i - n:
+            bests.popleft()
+
+        if i >= n - 1:
+            yield bests[0][1]
+
+
+def rollmin(l: Iterable, n: int) -> Iterator:
+    """Return the minimums of the slides of size n from l (O(1) amortized).
+
+    >>> list(rollmin((3, 1, 4, 1, 5, 9, 2), 3))
+    [1, 1, 1, 1, 2]
+    """
+    return _rollbest(l, n, op.ge)
+
+
+def rollmax(l: Iterable, n: int) -> Iterator:
+    """Return the maximums of the slides of size n from l (O(1) amortized).
+
+    >>> list(rollmax((3, 1, 4, 1, 5, 9, 2), 3))
+    [4, 4, 5, 9, 9]
+    """
+    return _rollbest(l, n, op.le)
 
 
 # }}}
@@ -358,14 +1210,15 @@ def nth(l: Iterable, n: int, d: Any = None) -> Optional[Any]:
     True
     >>> nth(range(5), 9, False)
     False
+    >>> nth(iter(range(5)), 3)
+    3
     """
     assert n >= 0, "n must be greater or equals to 0"
 
-    for i, x in enumerate(l):
-        if i == n:
-            return x
+    if _sequence(l):
+        return l[n] if n < _size(l) else d  # type: ignore
 
-    return d
+    return next(slice(l, n, None), d)
 
 
 def first(l: Iterable, d: Any = None) -> Optional[Any]:
@@ -408,16 +1261,20 @@ def last(it: Iterable, d: Any = None) -> Optional[Any]:
     4
     >>> last(range(0)) is None
     True
+    >>> last(x for x in range(0, 5))
+    4
+    >>> last(iter(()), 0)
+    0
     """
-    x = None
+    if _sequence(it):
+        return it[-1] if _size(it) else d  # type: ignore
 
-    for x in it:
-        pass
+    if _reversible(it):
+        return next(reversed(it), d)  # type: ignore
 
-    try:
-        return x
-    except UnboundLocalError:
-        return d
+    window = collections.deque(it, maxlen=1)
+
+    return window[0] if window else d
 
 
 def butlast(l: Iterable) -> Iterator:
@@ -428,11 +1285,7 @@ def butlast(l: Iterable) -> Iterator:
     >>> list(butlast(range(5)))
     [0, 1, 2, 3]
     """
-    left, right = tee(l)
-    right = rest(right)
-
-    for a, _ in zip(left, right):
-        yield a
+    return droplast(l, 1)
 
 
 def sub(l: Iterable, start: int, stop: int) -> Iterator:
@@ -442,7 +1295,12 @@ def sub(l: Iterable, start: int, stop: int) -> Iterator:
     [3, 4]
     >>> list(sub(range(9), 3, 6))
     [3, 4, 5]
+    >>> list(sub(iter(range(9)), 3, 6))
+    [3, 4, 5]
     """
+    if _sequence(l) and start >= 0 and (stop is None or stop >= 0):
+        return iter(l[start:stop])  # type: ignore
+
     return slice(l, start, stop)
 
 
@@ -486,14 +1344,21 @@ def takelast(l: Iterable, n: int) -> Iterator:
     []
     >>> list(takelast(range(9), 3))
     [6, 7, 8]
+    >>> list(takelast(iter(range(9)), 3))
+    [6, 7, 8]
     """
-    sl: tuple = tuple()
+    if _sequence(l):
+        size = _size(l)
 
-    for sl in slide(l, n):
-        pass
+        if 0 <= n <= size:
+            yield from l[size - n :]  # type: ignore
 
-    for x in sl:
-        yield x
+        return
+
+    window = collections.deque(l, maxlen=builtins.max(n, 0))
+
+    if builtins.len(window) == n:
+        yield from window
 
 
 def drop(l: Iterable, n: int) -> Iterator:
@@ -517,9 +1382,7 @@ def dropnth(l: Iterable, n: int) -> Iterator:
     """
     assert n > 0, "n must be greater than 0"
 
-    for i, x in enumerate(l, 1):
-        if i % n != 0:
-            yield x
+    return compress(l, cycle((True,) * (n - 1) + (False,)))
 
 
 def droplast(l: Iterable, n: int) -> Iterator:
@@ -529,12 +1392,21 @@ def droplast(l: Iterable, n: int) -> Iterator:
     []
     >>> list(droplast(range(9), 3))
     [0, 1, 2, 3, 4, 5]
+    >>> list(droplast(iter(range(9)), 3))
+    [0, 1, 2, 3, 4, 5]
     """
-    left, right = tee(l)
-    right = butlast(slide(right, n))
+    if _sequence(l):
+        stop = builtins.max(_size(l) - n, 0)
+        yield from map(l.__getitem__, range(stop))  # type: ignore
+        return
 
-    for a, _ in zip(left, right):
-        yield a
+    window: collections.deque = collections.deque()
+
+    for x in l:
+        window.append(x)
+
+        if builtins.len(window) > n:
+            yield window.popleft()
 
 
 def find(l: Iterable, p: fn.Predicate = bool, d: Any = None) -> Optional[Any]:
@@ -545,11 +1417,7 @@ def find(l: Iterable, p: fn.Predicate = bool, d: Any = None) -> Optional[Any]:
     >>> find(range(9), lambda x: x > 5)
     6
     """
-    for x in l:
-        if p(x):
-            return x
-
-    return d
+    return next(filter(p, l), d)
 
 
 # }}}
@@ -667,4 +1535,539 @@ permutated = itertools.permutations
 permutations = itertools.permutations
 combinations = itertools.combinations
 combinatoric = itertools.combinations_with_replacement
+
+
+def _comb(n: int, k: int) -> int:
+    """Return the number of ways to choose k items from n items."""
+    if not 0 <= k <= n:
+        return 0
+
+    return math.factorial(n) // (math.factorial(k) * math.factorial(n - k))
+
+
+def _perm(n: int, k: int) -> int:
+    """Return the number of ways to arrange k items from n items."""
+    if not 0 <= k <= n:
+        return 0
+
+    return math.factorial(n) // math.factorial(n - k)
+
+
+class Space(collections.abc.Sequence):
+    """Random access over the items of a combinatoric generator.
+
+    Space(f, *args, **kwargs) indexes the items of f(*args, **kwargs) where
+    f is product, permutations, combinations or combinatoric: the length,
+    the nth item (unrank) and the index of an item (rank) are computed
+    without enumeration, and shard enumerates any index range directly.
+
+    >>> space = Space(combinations, 'abcde', 3)
+    >>> len(space), space[6], space.index(('b', 'c', 'e'))
+    (10, ('b', 'c', 'd'), 7)
+    >>> list(space.shard(7, 9)) == list(combinations('abcde', 3))[7:9]
+    True
+    >>> space.shards(3)
+    [(0, 4), (4, 7), (7, 10)]
+    >>> nth(space, 6) == space[6] and contains(space, ('a', 'b', 'c'))
+    True
+
+    Spaces may exceed sys.maxsize items, where builtins.len overflows: use
+    size, or the it functions (len, nth, last...) which support it.
+
+    >>> huge = Space(combinations, range(100), 50)
+    >>> huge.size > 2 ** 63, len(huge) == huge.size, nth(huge, 5)[-3:]
+    (True, True, (47, 48, 54))
+    >>> last(huge) == tuple(range(50, 100)), list(takelast(huge, 1))[0][0]
+    (True, 50)
+    >>> Space(product, range(10), repeat=3)[123]
+    (1, 2, 3)
+    >>> Space(permutations, range(4)).index((3, 2, 1, 0))
+    23
+    >>> Space(combinatoric, 'ab', 3)[-1]
+    ('b', 'b', 'b')
+    """
+
+    def __init__(self, f: Callable, *args, **kwargs):
+        if f is product:
+            self.kind = "product"
+            self.pools = tuple(map(tuple, args)) * kwargs.get("repeat", 1)
+            self.r = builtins.len(self.pools)
+            self.n = 0
+        else:
+            kinds = {
+                permutations: "permutations",
+                combinations: "combinations",
+                combinatoric: "combinatoric",
+            }
+            assert f in kinds, "f must be a combinatoric generator of funpy.it"
+
+            self.kind = kinds[f]
+            pool = tuple(args[0])
+            r = args[1] if builtins.len(args) > 1 else kwargs.get("r")
+            self.r = builtins.len(pool) if r is None else r
+            self.n = builtins.len(pool)
+            self.pools = (pool,) * self.r
+
+        self.size = self._length()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, i):  # type: ignore
+        if isinstance(i, builtins.slice):
+            return builtins.list(map(self.__getitem__, range(*i.indices(self.size))))
+
+        if i < 0:
+            i += self.size
+
+        if not 0 <= i < self.size:
+            raise IndexError("space index out of range")
+
+        return self._values(self._unrank(i))
+
+    def __iter__(self) -> Iterator[tuple]:
+        return self.shard(0)
+
+    def __contains__(self, x: Any) -> bool:
+        try:
+            self.index(x)
+        except ValueError:
+            return False
+
+        return True
+
+    def index(self, x: Any, start: int = 0, stop: int = None) -> int:
+        """Return the index of the first occurrence of x (rank)."""
+        i = self._rank(self._indexes(x))
+
+        if not start <= i < (self.size if stop is None else stop):
+            raise ValueError("{!r} is not in the space range".format(x))
+
+        return i
+
+    def shard(self, start: int, stop: int = None) -> Iterator[tuple]:
+        """Enumerate the items from start to stop (setup without skipping)."""
+        start, stop, _ = builtins.slice(start, stop).indices(self.size)
+
+        if start >= stop:
+            return iter(())
+
+        if start == 0:
+            return slice(self._generator(), stop)
+
+        idx = self._unrank(start)
+        items = cat((self._values(idx),), concat(self._tails(idx)))
+
+        return slice(items, stop - start)
+
+    def shards(self, n: int) -> list:
+        """Split the indexes in n contiguous (start, stop) ranges."""
+        assert n > 0, "n must be greater than 0"
+
+        q, m = divmod(self.size, n)
+        stops = builtins.list(accumulate(q + (i < m) for i in range(n)))
+
+        return builtins.list(zip([0] + stops[:-1], stops))
+
+    # INDEXES (positions of the items in their pools)
+
+    def _generator(self) -> Iterator[tuple]:
+        if self.kind == "product":
+            return product(*self.pools)
+
+        pool = self.pools[0] if self.pools else ()
+        f = dict(permutations=permutations, combinations=combinations)
+
+        return f.get(self.kind, combinatoric)(pool, self.r)
+
+    def _values(self, idx: tuple) -> tuple:
+        return tuple(self.pools[j][v] for j, v in enumerate(idx))
+
+    def _length(self) -> int:
+        n, r = self.n, self.r
+
+        if self.kind == "product":
+            return reduce(op.mul, map(builtins.len, self.pools), 1)
+
+        if self.kind == "permutations":
+            return _perm(n, r)
+
+        if self.kind == "combinations":
+            return _comb(n, r)
+
+        return _comb(n + r - 1, r) if n else int(r == 0)
+
+    def _unrank(self, i: int) -> tuple:
+        n, r = self.n, self.r
+
+        if self.kind == "product":
+            idx = []
+
+            for pool in builtins.reversed(self.pools):
+                i, v = divmod(i, builtins.len(pool))
+                idx.append(v)
+
+            return tuple(builtins.reversed(idx))
+
+        if self.kind == "permutations":
+            remaining, idx = builtins.list(range(n)), []
+
+            for j in range(r):
+                q, i = divmod(i, _perm(n - 1 - j, r - 1 - j))
+                idx.append(remaining.pop(q))
+
+            return tuple(idx)
+
+        if self.kind == "combinations":
+            return _unrankcomb(n, r, i)
+
+        return tuple(c - j for j, c in enumerate(_unrankcomb(n + r - 1, r, i)))
+
+    def _rank(self, idx: tuple) -> int:
+        n, r = self.n, self.r
+
+        if self.kind == "product":
+            i = 0
+
+            for pool, v in zip(self.pools, idx):
+                i = i * builtins.len(pool) + v
+
+            return i
+
+        if self.kind == "permutations":
+            remaining, i = builtins.list(range(n)), 0
+
+            for j, v in enumerate(idx):
+                i += remaining.index(v) * _perm(n - 1 - j, r - 1 - j)
+                remaining.remove(v)
+
+            return i
+
+        if self.kind == "combinations":
+            return _rankcomb(n, r, idx)
+
+        return _rankcomb(n + r - 1, r, tuple(v + j for j, v in enumerate(idx)))
+
+    def _indexes(self, x: Any) -> tuple:
+        """Return the smallest positions of the values of x in their pools."""
+        try:
+            x = tuple(x)
+        except TypeError:
+            raise ValueError("{!r} is not in the space".format(x))
+
+        if builtins.len(x) != self.r:
+            raise ValueError("{!r} is not in the space".format(x))
+
+        idx: list = []
+
+        try:
+            for pool, value in zip(self.pools, x):
+                idx.append(self._position(pool, value, idx))
+        except ValueError:
+            raise ValueError("{!r} is not in the space".format(x))
+
+        return tuple(idx)
+
+    def _position(self, pool: tuple, value: Any, idx: list) -> int:
+        """Return the first position of value in pool available after idx."""
+        if self.kind == "product":
+            return pool.index(value)
+
+        if self.kind == "combinations":
+            return pool.index(value, idx[-1] + 1 if idx else 0)
+
+        if self.kind == "combinatoric":
+            return pool.index(value, idx[-1] if idx else 0)
+
+        for v, y in enumerate(pool):
+            if y == value and v not in idx:
+                return v
+
+        raise ValueError("value is not in pool")
+
+    def _tails(self, idx: tuple) -> Iterator[Iterator[tuple]]:
+        """Yield the iterators of the items following idx, in order."""
+        for j in builtins.reversed(range(self.r)):
+            prefix = self._values(idx[:j])
+            used = builtins.set(idx[:j])
+
+            for v in self._candidates(j, idx, used):
+                head = prefix + (self.pools[j][v],)
+
+                yield map(head.__add__, self._rest(j, v, used))
+
+    def _candidates(self, j: int, idx: tuple, used: set) -> Iterable[int]:
+        """Return the positions greater than idx[j] available at j."""
+        size = builtins.len(self.pools[j])
+
+        if self.kind == "permutations":
+            return (v for v in range(idx[j] + 1, size) if v not in used)
+
+        return range(idx[j] + 1, size)
+
+    def _rest(self, j: int, v: int, used: set) -> Iterator[tuple]:
+        """Return the items of the positions after j when j is at v."""
+        pool, r = self.pools[j], self.r - 1 - j
+
+        if self.kind == "product":
+            return product(*self.pools[j + 1 :])
+
+        if self.kind == "permutations":
+            left = tuple(y for u, y in enumerate(pool) if u not in used and u != v)
+
+            return permutations(left, r)
+
+        if self.kind == "combinations":
+            return combinations(pool[v + 1 :], r)
+
+        return combinatoric(pool[v:], r)
+
+
+def _unrankcomb(n: int, r: int, i: int) -> tuple:
+    """Return the positions of the ith combination of r items from n."""
+    size, c, idx = n, _comb(n, r), []
+
+    while r:
+        c, n, r = c * r // n, n - 1, r - 1
+
+        while i >= c:
+            i -= c
+            c, n = c * (n - r) // n, n - 1
+
+        idx.append(size - 1 - n)
+
+    return tuple(idx)
+
+
+def _rankcomb(n: int, r: int, idx: tuple) -> int:
+    """Return the index of the combination of r items from n at idx."""
+    if not r:
+        return 0
+
+    return _comb(n, r) - 1 - sum(_comb(n - 1 - c, r - j) for j, c in enumerate(idx))
+
+
+# }}}
+# STREAMS {{{
+_FUSABLE = ("map", "filter", "remove")
+
+
+@functools.lru_cache(maxsize=None)
+def _fuse(kinds: Tuple[str, ...]) -> Callable:
+    """Compile a single loop running map, filter and remove stages.
+
+    >>> fused = _fuse(('map', 'filter', 'remove'))
+    >>> list(fused(range(6), op.inc, op.iseven, lambda x: x > 4))
+    [2, 4]
+    """
+    fs = ", ".join("f{}".format(i) for i in range(builtins.len(kinds)))
+    lines = ["def fused(l, {}):".format(fs), "    for x in l:"]
+
+    for i, kind in enumerate(kinds):
+        if kind == "map":
+            lines.append("        x = f{}(x)".format(i))
+        else:
+            test = "not f{}(x)" if kind == "filter" else "f{}(x)"
+            lines.append("        if {}:".format(test.format(i)))
+            lines.append("            continue")
+
+    lines.append("        yield x")
+    namespace: dict = {}
+    exec("\n".join(lines), namespace)  # pylint: disable=exec-used
+
+    return namespace["fused"]
+
+
+def _merge(a: tuple, b: tuple) -> tuple:
+    """Merge two consecutive slice stages into one.
+
+    >>> _merge(('slice', 2, None, 1), ('slice', 1, 3, 2))
+    ('slice', 3, 5, 2)
+    """
+    _, start1, stop1, step1 = a
+    _, start2, stop2, step2 = b
+    start = start1 + start2 * step1
+    stop = None if stop2 is None else start1 + stop2 * step1
+
+    if stop1 is not None:
+        stop = stop1 if stop is None else builtins.min(stop, stop1)
+
+    return "slice", start, stop, step1 * step2
+
+
+def _optimize(plan: tuple) -> list:
+    """Move slices before the maps they follow and merge adjacent slices.
+
+    >>> _optimize((('map', str), ('slice', 1, None, 1), ('slice', 0, 2, 1)))
+    [('slice', 1, 3, 1), ('map', <class 'str'>)]
+    """
+    stages: list = []
+
+    for stage in plan:
+        if stage[0] != "slice":
+            stages.append(stage)
+            continue
+
+        maps: list = []
+
+        while stages and stages[-1][0] == "map":
+            maps.insert(0, stages.pop())
+
+        if stages and stages[-1][0] == "slice":
+            stage = _merge(stages.pop(), stage)
+
+        stages.append(stage)
+        stages.extend(maps)
+
+    return stages
+
+
+class Stream:
+    """Lazy fluent chain of funpy.it stages, optimized when iterated.
+
+    Slices (take, drop) are moved before the maps they follow and merged,
+    a leading slice of a sequence indexes it directly, and adjacent map,
+    filter and remove stages are fused into a single loop.
+
+    >>> s = Stream(range(10)).map(op.inc).filter(op.iseven).map(str)
+    >>> s.take(3).list()
+    ['2', '4', '6']
+    >>> s.stages()
+    ['fused(map, filter, map)']
+    >>> Stream(range(10)).map(op.inc).drop(2).take(3).stages()
+    ['index(2, 5, 1)', 'map']
+    >>> Stream(range(10)).pipe(chunk, 3).map(sum).list()
+    [3, 12, 21]
+    """
+
+    def __init__(self, l: Iterable, plan: tuple = ()):
+        self.l = l
+        self.plan = plan
+
+    def __repr__(self) -> str:
+        return "Stream({})".format(", ".join(self.stages()))
+
+    def __iter__(self) -> Iterator:
+        l = self.l
+
+        for _, step in self._steps():
+            l = step(l)
+
+        return iter(l)
+
+    def _then(self, *stage: Any) -> "Stream":
+        return Stream(self.l, self.plan + (stage,))
+
+    def _steps(self) -> Iterator[Tuple[str, Callable]]:
+        """Yield the names and functions of the optimized stages."""
+        stages = _optimize(self.plan)
+
+        if stages and stages[0][0] == "slice" and _sequence(self.l):
+            _, start, stop, step = stages.pop(0)
+            size = _size(self.l)
+            stop = size if stop is None else builtins.min(stop, size)
+            indexes = range(builtins.min(start, size), stop, step)
+            name = "index({}, {}, {})".format(start, stop, step)
+
+            yield name, lambda l: map(l.__getitem__, indexes)
+
+        for fusable, group in groupby(stages, lambda s: s[0] in _FUSABLE):
+            steps = builtins.list(group)
+
+            if fusable and builtins.len(steps) > 1:
+                kinds = tuple(s[0] for s in steps)
+                fused = _fuse(kinds)
+                fs = [s[1] for s in steps]
+
+                yield "fused({})".format(", ".join(kinds)), (
+                    lambda l, fused=fused, fs=fs: fused(l, *fs)
+                )
+                continue
+
+            for stage in steps:
+                yield _step(stage)
+
+    # STAGES
+
+    def map(self, f: Callable) -> "Stream":
+        """Apply f on each item."""
+        return self._then("map", f)
+
+    def filter(self, p: fn.Predicate = None) -> "Stream":
+        """Keep the items where p is True."""
+        return self._then("filter", p or bool)
+
+    def remove(self, p: fn.Predicate = None) -> "Stream":
+        """Remove the items where p is True."""
+        return self._then("remove", p or bool)
+
+    def slice(self, start: int = 0, stop: int = None, step: int = 1) -> "Stream":
+        """Keep the items from start to stop every step."""
+        assert start >= 0, "start must be greater or equals to 0"
+        assert stop is None or stop >= 0, "stop must be greater or equals to 0"
+        assert step > 0, "step must be greater than 0"
+
+        return self._then("slice", start, stop, step)
+
+    def take(self, n: int) -> "Stream":
+        """Keep the first n items."""
+        return self.slice(0, n)
+
+    def drop(self, n: int) -> "Stream":
+        """Drop the first n items."""
+        return self.slice(n)
+
+    def pipe(self, f: Callable, *args, **kwargs) -> "Stream":
+        """Apply f(l, *args, **kwargs) on the items (e.g. chunk, distinct)."""
+        return self._then("pipe", f, args, kwargs)
+
+    # TERMINALS
+
+    def stages(self) -> list:
+        """Return the names of the optimized stages."""
+        return [name for name, _ in self._steps()]
+
+    def list(self) -> list:
+        """Return the items in a list."""
+        return builtins.list(self)
+
+    def reduce(self, f: Callable, *initial: Any) -> Any:
+        """Reduce the items with f."""
+        return reduce(f, self, *initial)
+
+    def first(self, d: Any = None) -> Optional[Any]:
+        """Return the first item or d."""
+        return first(self, d)
+
+    def len(self) -> int:
+        """Return the number of items."""
+        return len(self)
+
+
+def _step(stage: tuple) -> Tuple[str, Callable]:
+    """Return the name and function of a stage (not fused)."""
+    kind = stage[0]
+
+    if kind == "slice":
+        _, start, stop, step = stage
+
+        return (
+            "slice({}, {}, {})".format(start, stop, step),
+            lambda l: slice(l, start, stop, step),
+        )
+
+    if kind == "pipe":
+        _, f, args, kwargs = stage
+
+        return (
+            "pipe({})".format(getattr(f, "__name__", f)),
+            lambda l: f(l, *args, **kwargs),
+        )
+
+    f = stage[1]
+    apply = dict(map=map, filter=filter, remove=remove)[kind]
+
+    return kind, lambda l: apply(f, l)
+
+
 # }}}
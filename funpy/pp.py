@@ -1,17 +1,1151 @@
 """Parallel library"""
 
+import asyncio
+import collections
+import contextlib
+import functools
+import heapq
+import inspect
+import itertools
+import os
+import pickle
+import queue
+import sys
+import threading
+import time
 from concurrent import futures
-from typing import Callable, Iterable, Type
+from multiprocessing import connection
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
-from funpy import it
+from funpy import fn, it
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # python < 3.8
+    shared_memory = None  # type: ignore
 
 # TYPES {{{
 
-Pool = Type[futures.Executor]
+Pool = Union[Type[futures.Executor], futures.Executor]
 
 ThreadPool = futures.ThreadPoolExecutor
 
 ProcessPool = futures.ProcessPoolExecutor
+
+InterpreterPool = getattr(futures, "InterpreterPoolExecutor", None)  # python 3.14+
+# }}}
+# BACKENDS {{{
+def freethreaded() -> bool:
+    """Return True if threads run in parallel (free-threaded python build)."""
+    isgil = getattr(sys, "_is_gil_enabled", None)
+
+    return isgil is not None and not isgil()
+
+
+def fastest() -> Type[futures.Executor]:
+    """Return the cheapest pool that runs python code in parallel.
+
+    Threads on free-threaded builds, then interpreters (python 3.14+),
+    then processes.
+
+    >>> fastest() in (ThreadPool, InterpreterPool, ProcessPool)
+    True
+    """
+    if freethreaded():
+        return ThreadPool
+
+    if InterpreterPool is not None:
+        return InterpreterPool
+
+    return ProcessPool
+
+
+def _isolated(pool: Type[futures.Executor]) -> bool:
+    """Return True if the workers of pool don't share the module state."""
+    if InterpreterPool is not None and issubclass(pool, InterpreterPool):
+        return True
+
+    return issubclass(pool, ProcessPool)
+
+
+AutoPool = fastest()
+# }}}
+# HELPERS {{{
+@contextlib.contextmanager
+def _executor(
+    pool: Pool, workers: Optional[int], wait: bool = True
+) -> Iterator[futures.Executor]:
+    """Yield an executor from pool (shut down on exit unless shared)."""
+    if isinstance(pool, futures.Executor):
+        yield pool
+    else:
+        p = _spawn(pool, workers)
+
+        try:
+            yield p
+        finally:
+            p.shutdown(wait=wait)
+
+
+def _starmap(f: Callable, chunk: Iterable[tuple]) -> list:
+    """Apply f on each arguments of chunk (in a worker)."""
+    return list(itertools.starmap(f, chunk))
+
+
+def _combine(combiner: Callable, mapper: Callable, chunk: Iterable[tuple]) -> list:
+    """Map then combine the values of each key of chunk (in a worker)."""
+    mapped = itertools.starmap(mapper, chunk)
+
+    return [(k, combiner(vs)) for k, vs in it.groupkv(mapped)]
+
+
+def _shuffle(partitions: int, combiner: Optional[Callable], pairs: Iterable) -> list:
+    """Group (or combine) the values of each key of pairs by key partition.
+
+    Keys are hashed by the parent as the pairs arrive, so each key lands in
+    one partition even if its hash differs between workers (e.g. str).
+
+    >>> _shuffle(2, None, ((0, 1), (1, 2), (0, 3)))
+    [{0: [1, 3]}, {1: [2]}]
+    >>> _shuffle(2, sum, ((0, 1), (1, 2), (0, 3)))
+    [{0: [4]}, {1: [2]}]
+    """
+    buckets: list = [{} for _ in range(partitions)]
+
+    for k, v in pairs:
+        index = buckets[hash(k) % partitions]
+
+        if k not in index:
+            index[k] = [v]
+        elif combiner is None:
+            index[k].append(v)
+        else:
+            index[k][0] = combiner((index[k][0], v))
+
+    return buckets
+
+
+def _select(p: Callable, chunk: Iterable[tuple]) -> list:
+    """Keep the items of chunk where p is True (in a worker)."""
+    return [x for x, in chunk if p(x)]
+
+
+def _fold1(f: Callable, chunk: Iterable[tuple]) -> list:
+    """Reduce the items of chunk with f into a singleton (in a worker)."""
+    return [functools.reduce(f, (x for x, in chunk))]
+
+
+def _sortrun(reverse: bool, key: Optional[Callable], chunk: Iterable[tuple]) -> list:
+    """Sort the items of chunk into a singleton run (in a worker)."""
+    return [sorted((x for x, in chunk), key=key, reverse=reverse)]
+
+
+def _reduce(reducer: Callable, groups: Iterable[tuple]) -> list:
+    """Reduce the values of each key of groups (in a worker)."""
+    return [(k, reducer(vs)) for k, vs in groups]
+
+
+def _fold(combiner: Callable, pairs: Iterable[tuple]) -> Iterable[tuple]:
+    """Combine the values of each key of pairs as they arrive.
+
+    >>> list(_fold(sum, ((0, 1), (1, 2), (0, 3))))
+    [(0, 4), (1, 2)]
+    """
+    index: dict = {}
+
+    for k, v in pairs:
+        index[k] = combiner((index[k], v)) if k in index else v
+
+    return index.items()
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    """Return the seconds left before deadline (None if unbounded)."""
+    if deadline is None:
+        return None
+
+    return deadline - time.monotonic()
+
+
+def _window(workers: Optional[int]) -> int:
+    """Return a default number of chunks in flight for workers."""
+    return 2 * (workers or os.cpu_count() or 1)
+
+
+def _timed(run: Callable, f: Callable, chunk: tuple) -> Tuple[float, list]:
+    """Return the duration and results of run(f, chunk) (in a worker)."""
+    start = time.perf_counter()
+    results = run(f, chunk)
+
+    return time.perf_counter() - start, results
+
+
+class _Chunker:
+    """Cut arguments into chunks of a fixed or adaptive size.
+
+    An adaptive chunker (size None) starts with chunks of 1 item, then sizes
+    the next chunks from the measured timings toward target seconds per task
+    (growing at most twice per measure, shrinking as needed).
+
+    >>> c = _Chunker(None, target=1.0)
+    >>> [chunk for _, chunk in c.chunks(range(2))]
+    [(0,), (1,)]
+    >>> c.update(1, 0.1)
+    >>> c.size
+    2
+    >>> c.update(10, 10.0)
+    >>> c.size
+    1
+    """
+
+    def __init__(
+        self, size: Optional[int], target: float = 0.05, limit: int = 4096
+    ):
+        assert size is None or size > 0, "chunksize must be greater than 0"
+
+        self.adaptive = size is None
+        self.size = size or 1
+        self.target = target
+        self.limit = limit
+        self.cost: Optional[float] = None
+
+    def chunks(self, l: Iterable) -> Iterator[Tuple[int, tuple]]:
+        """Yield (offset, chunk) from l with the current size."""
+        l, offset = iter(l), 0
+
+        while True:
+            chunk = tuple(it.take(l, self.size))
+
+            if not chunk:
+                return
+
+            yield offset, chunk
+            offset += len(chunk)
+
+    def update(self, n: int, seconds: float) -> None:
+        """Adapt the size from the duration of a chunk of n items."""
+        if not self.adaptive:
+            return
+
+        cost = seconds / n
+        self.cost = cost if self.cost is None else (self.cost + cost) / 2
+        ideal = self.target / self.cost if self.cost > 0 else self.limit
+        self.size = int(max(1, min(ideal, 2 * self.size, self.limit)))
+
+
+# shared memory handle of a buffer (kind: bytes, bytearray or memoryview)
+_Shared = collections.namedtuple("_Shared", "name nbytes format shape kind")
+
+
+def _share(x: Any, threshold: int, segments: list) -> Any:
+    """Move x to a new shared memory segment if it is a large buffer.
+
+    >>> segments: list = []
+    >>> _share(b'ab', 3, segments)
+    b'ab'
+    >>> handle = _share(b'abc', 3, segments)
+    >>> handle.nbytes, handle.kind
+    (3, <class 'bytes'>)
+    >>> _unshare(handle)
+    b'abc'
+    """
+    try:
+        view = memoryview(x)
+        view.cast("B").cast(view.format, view.shape)
+    except (TypeError, ValueError):
+        return x
+
+    if view.nbytes < threshold:
+        return x
+
+    segment = shared_memory.SharedMemory(create=True, size=max(view.nbytes, 1))
+    segments.append(segment)
+    segment.buf[: view.nbytes] = view.cast("B")
+    kind = type(x) if type(x) in (bytes, bytearray) else memoryview
+
+    return _Shared(segment.name, view.nbytes, view.format, view.shape, kind)
+
+
+def _unshare(x: Any) -> Any:
+    """Return a private copy of x if it is a shared memory handle (unlinked)."""
+    if not isinstance(x, _Shared):
+        return x
+
+    segment = shared_memory.SharedMemory(name=x.name)
+
+    try:
+        data = bytes(segment.buf[: x.nbytes])
+    finally:
+        segment.close()
+        segment.unlink()
+
+    if x.kind is memoryview:
+        return memoryview(data).cast(x.format, x.shape)
+
+    return x.kind(data)
+
+
+def _attach(x: Any, attached: list) -> Any:
+    """Return a read-only view on x if it is a shared memory handle."""
+    if not isinstance(x, _Shared):
+        return x
+
+    segment = shared_memory.SharedMemory(name=x.name)
+    base = segment.buf[: x.nbytes]
+    cast = base.cast(x.format, x.shape)
+    view = cast.toreadonly()
+    attached.append((segment, (view, cast, base)))
+
+    return view
+
+
+def _detach(attached: list) -> None:
+    """Release the views and close the segments of attached."""
+    for segment, views in attached:
+        try:
+            for view in views:
+                view.release()
+
+            segment.close()
+        except BufferError:  # a view escaped the call: let the gc close it
+            pass
+
+
+def _release(segments: list) -> None:
+    """Close and unlink the shared memory segments."""
+    for segment in segments:
+        segment.close()
+        segment.unlink()
+
+
+def _sharing(run: Callable, threshold: int, f: Callable, chunk: tuple) -> list:
+    """Run f on chunk with shared memory arguments and results (in a worker)."""
+    attached: list = []
+
+    try:
+        chunk = tuple(tuple(_attach(x, attached) for x in args) for args in chunk)
+        results = run(f, chunk)
+        segments: list = []
+        shared = [_share(x, threshold, segments) for x in results]
+
+        for segment in segments:
+            segment.close()
+
+        return [x.tobytes() if isinstance(x, memoryview) else x for x in shared]
+    finally:
+        _detach(attached)
+
+
+def _stream(
+    p: futures.Executor,
+    f: Callable,
+    ls: tuple,
+    buffersize: int,
+    chunksize: Optional[int],
+    timeout: Optional[float],
+    run: Callable = _starmap,
+    shared: int = None,
+) -> Generator:
+    """Map f on ls with at most buffersize chunks in flight (ordered).
+
+    Each chunk is computed in a worker by run(f, chunk). If shared is set,
+    buffers of at least shared bytes are passed through shared memory.
+
+    >>> from funpy import op
+    >>> with ThreadPool() as p:
+    ...     list(_stream(p, op.neg, (range(5),), 2, 2, None))
+    [0, -1, -2, -3, -4]
+    >>> with ThreadPool() as p:
+    ...     list(_stream(p, bytes, ([b'a', b'bc'],), 2, 1, None, shared=2))
+    [b'a', b'bc']
+    """
+    assert buffersize > 0, "buffersize must be greater than 0"
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    chunker = _Chunker(chunksize)
+    chunks = chunker.chunks(zip(*ls))
+    tasks: Deque[Tuple[int, futures.Future, list]] = collections.deque()
+
+    if shared is not None:
+        run = functools.partial(_sharing, run, shared)
+
+    def submit(chunk: tuple) -> None:
+        segments: list = []
+
+        if shared is not None:
+            chunk = tuple(
+                tuple(_share(x, shared, segments) for x in args) for args in chunk
+            )
+
+        tasks.append((len(chunk), p.submit(_timed, run, f, chunk), segments))
+
+    def collect(task: futures.Future, segments: list, t: float = None) -> tuple:
+        try:
+            seconds, results = task.result(t)
+        finally:
+            if task.done():
+                _release(segments)
+
+        if shared is not None:
+            results = [_unshare(x) for x in results]
+
+        return seconds, results
+
+    try:
+        for _, chunk in it.take(chunks, buffersize):
+            submit(chunk)
+
+        while tasks:
+            n, task, segments = tasks[0]
+            seconds, results = collect(task, segments, _remaining(deadline))
+            chunker.update(n, seconds)
+            tasks.popleft()
+
+            # refill the window before yielding to keep the workers busy
+            for _, chunk in it.take(chunks, 1):
+                submit(chunk)
+
+            yield from results
+    finally:
+        for _, task, _ in tasks:
+            task.cancel()
+
+        # wait for the running tasks to reclaim their shared segments
+        for _, task, segments in tasks:
+            if task.cancelled():
+                _release(segments)
+            elif shared is not None:
+                with contextlib.suppress(Exception):
+                    collect(task, segments)
+
+
+class _Attempts:
+    """Concurrent attempts of a chunk, from the submission of the first."""
+
+    def __init__(self, chunk: tuple, task: futures.Future):
+        self.chunk = chunk
+        self.tasks = [task]
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        task.add_done_callback(self.finish)
+
+    def finish(self, _: futures.Future) -> None:
+        """Record when the first attempt completes."""
+        if self.finished is None:
+            self.finished = time.monotonic()
+
+    def winner(self) -> Optional[futures.Future]:
+        """Return the first completed attempt (or None)."""
+        return next((t for t in self.tasks if t.done()), None)
+
+
+def _quantile(xs: Iterable[float], q: float) -> float:
+    """Return the q quantile of xs (nearest rank).
+
+    >>> _quantile([4, 1, 3, 2], 0.5)
+    2
+    """
+    xs = sorted(xs)
+
+    return xs[int(q * (len(xs) - 1))]
+
+
+def _speculate(
+    p: futures.Executor,
+    f: Callable,
+    ls: tuple,
+    buffersize: int,
+    chunksize: Optional[int],
+    timeout: Optional[float],
+    quantile: float,
+    samples: int = 10,
+) -> Iterator:
+    """Map f on ls with duplicate attempts of slow chunks (ordered).
+
+    Once samples latencies are known, a chunk running for longer than the
+    quantile of the recent latencies is submitted again, and the first
+    attempt to complete wins. timeout is a deadline for each chunk.
+
+    >>> from funpy import op
+    >>> with ThreadPool() as p:
+    ...     list(_speculate(p, op.neg, (range(5),), 2, 2, None, 0.9))
+    [0, -1, -2, -3, -4]
+    """
+    assert buffersize > 0, "buffersize must be greater than 0"
+    assert 0 < quantile <= 1, "quantile must be between 0 and 1"
+
+    chunker = _Chunker(chunksize)
+    chunks = chunker.chunks(zip(*ls))
+    latencies: Deque[float] = collections.deque(maxlen=256)
+    tasks: Deque[_Attempts] = collections.deque()
+
+    def submit(chunk: tuple) -> None:
+        tasks.append(_Attempts(chunk, p.submit(_timed, _starmap, f, chunk)))
+
+    try:
+        for _, chunk in it.take(chunks, buffersize):
+            submit(chunk)
+
+        while tasks:
+            head = tasks[0]
+
+            while head.winner() is None:
+                now, wakes = time.monotonic(), []
+                threshold = None
+
+                if len(latencies) >= samples:
+                    threshold = _quantile(latencies, quantile)
+
+                if timeout is not None:
+                    if now - head.started >= timeout:
+                        raise futures.TimeoutError()
+
+                    wakes.append(head.started + timeout)
+
+                # duplicate the outliers still running on a single attempt
+                for attempts in tasks if threshold is not None else ():
+                    if len(attempts.tasks) > 1 or attempts.finished is not None:
+                        continue
+
+                    if now - attempts.started >= threshold:
+                        task = p.submit(_timed, _starmap, f, attempts.chunk)
+                        task.add_done_callback(attempts.finish)
+                        attempts.tasks.append(task)
+                    else:
+                        wakes.append(attempts.started + threshold)
+
+                wait = max(0.0, min(wakes) - now) if wakes else None
+                futures.wait(head.tasks, wait, return_when=futures.FIRST_COMPLETED)
+
+            tasks.popleft()
+            winner = head.winner()
+            latencies.append(head.finished - head.started)  # type: ignore
+
+            for task in head.tasks:
+                task.cancel()
+
+            seconds, results = winner.result()  # type: ignore
+            chunker.update(len(head.chunk), seconds)
+
+            for _, chunk in it.take(chunks, 1):
+                submit(chunk)
+
+            yield from results
+    finally:
+        for attempts in tasks:
+            for task in attempts.tasks:
+                task.cancel()
+
+
+def _unstream(
+    p: futures.Executor,
+    f: Callable,
+    ls: tuple,
+    buffersize: int,
+    chunksize: Optional[int],
+    timeout: Optional[float],
+) -> Iterator[Tuple[int, Any]]:
+    """Map f on ls with at most buffersize chunks in flight (unordered).
+
+    >>> from funpy import op
+    >>> with ThreadPool() as p:
+    ...     sorted(_unstream(p, op.neg, (range(5),), 2, 2, None))
+    [(0, 0), (1, -1), (2, -2), (3, -3), (4, -4)]
+    """
+    assert buffersize > 0, "buffersize must be greater than 0"
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    chunker = _Chunker(chunksize)
+    chunks = chunker.chunks(zip(*ls))
+    tasks: Dict[futures.Future, int] = {}
+
+    try:
+        for i, chunk in it.take(chunks, buffersize):
+            tasks[p.submit(_timed, _starmap, f, chunk)] = i
+
+        while tasks:
+            done, _ = futures.wait(
+                tasks, _remaining(deadline), return_when=futures.FIRST_COMPLETED
+            )
+
+            if not done:
+                raise futures.TimeoutError()
+
+            for task in done:
+                start = tasks.pop(task)
+                seconds, results = task.result()
+                chunker.update(len(results), seconds)
+
+                for i, chunk in it.take(chunks, 1):
+                    tasks[p.submit(_timed, _starmap, f, chunk)] = i
+
+                yield from it.enumerate(results, start)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+# }}}
+# BROADCASTS {{{
+_broadcasts: dict = {}
+
+_keys = itertools.count()
+
+
+def _initialize(
+    broadcasts: dict, initializer: Optional[Callable], initargs: tuple
+) -> None:
+    """Install the broadcasts then call initializer (in a worker)."""
+    _broadcasts.update(broadcasts)
+
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _spawn(
+    pool: Type[futures.Executor],
+    workers: Optional[int],
+    initializer: Callable = None,
+    initargs: tuple = (),
+    **kwargs,
+) -> futures.Executor:
+    """Create an executor from pool whose workers know the broadcasts."""
+    if _isolated(pool):
+        initargs = (dict(_broadcasts), initializer, initargs)
+        initializer = _initialize
+
+    if initializer is not None:
+        kwargs.update(initializer=initializer, initargs=initargs)
+
+    return pool(max_workers=workers, **kwargs)
+
+
+class Broadcast:
+    """Read-only value sent once to each worker and referred by handle.
+
+    Tasks only pickle the handle: the value is inherited copy-on-write by
+    forked workers, or sent once per worker by the pool initializer. Thus
+    broadcasts must be created before the workers are started.
+
+    >>> table = Broadcast({'a': 1, 'b': 2})
+    >>> list(pmap(fn.partial(getvalue, table), 'ab', pool=ThreadPool))
+    [1, 2]
+    >>> table.destroy()
+    >>> table.value
+    Traceback (most recent call last):
+    ...
+    LookupError: broadcast is not available (create it before the workers)
+    """
+
+    def __init__(self, value: Any):
+        self.key = "{}-{}".format(os.getpid(), next(_keys))
+        _broadcasts[self.key] = value
+
+    def __repr__(self) -> str:
+        return "Broadcast({!r})".format(self.key)
+
+    @property
+    def value(self) -> Any:
+        """Return the value of the broadcast in the current process."""
+        try:
+            return _broadcasts[self.key]
+        except KeyError:
+            raise LookupError(
+                "broadcast is not available (create it before the workers)"
+            ) from None
+
+    def destroy(self) -> None:
+        """Forget the value of the broadcast in the current process."""
+        _broadcasts.pop(self.key, None)
+
+
+def getvalue(b: Broadcast, k: Any) -> Any:
+    """Return the item k of the broadcast b (picklable with partial)."""
+    return b.value[k]
+
+
+# }}}
+# SESSIONS {{{
+class Session(futures.Executor):
+    """Long-lived pool of warm workers shared between calls (thread-safe).
+
+    Workers are started on first use (or by start) and kept alive until
+    shutdown. A broken pool (e.g. a killed process) is restarted. Extra
+    kwargs (e.g. initializer and initargs) are given to the pool.
+
+    >>> from funpy import op
+    >>> with Session(ThreadPool, workers=2) as s:
+    ...     list(pmap(op.neg, range(3), pool=s))
+    ...     list(mapreduce(fn.ident, sum, [(0, 1), (0, 2)], pool=s))
+    [0, -1, -2]
+    [(0, 3)]
+    >>> s.submit(op.neg, 1)
+    Traceback (most recent call last):
+    ...
+    RuntimeError: cannot use a session after shutdown
+    """
+
+    def __init__(
+        self,
+        pool: Type[futures.Executor] = ProcessPool,
+        workers: int = None,
+        **kwargs,
+    ):
+        self.pool = pool
+        self.workers = workers
+        self.kwargs = kwargs
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor: Optional[futures.Executor] = None
+
+    def start(self) -> futures.Executor:
+        """Start the workers (if needed) and return the underlying executor."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("cannot use a session after shutdown")
+
+            if self._executor is None or getattr(self._executor, "_broken", False):
+                if self._executor is not None:  # release the broken pool
+                    self._executor.shutdown(wait=False)
+
+                self._executor = _spawn(self.pool, self.workers, **self.kwargs)
+
+                # spawn the workers now rather than on the first tasks
+                warmups = getattr(self._executor, "_max_workers", 1)
+                futures.wait(
+                    [self._executor.submit(fn.ident, None) for _ in range(warmups)]
+                )
+
+            return self._executor
+
+    def submit(self, f, *args, **kwargs) -> futures.Future:  # type: ignore
+        """Submit f(*args, **kwargs) to the workers."""
+        return self.start().submit(f, *args, **kwargs)
+
+    def map(self, f, *ls, **kwargs) -> Iterator:  # type: ignore
+        """Map f on ls with the workers (chunksize supported by process pools)."""
+        return self.start().map(f, *ls, **kwargs)
+
+    def shutdown(self, wait: bool = True, **kwargs) -> None:  # type: ignore
+        """Stop the workers and refuse new tasks."""
+        with self._lock:
+            executor, self._executor, self._closed = self._executor, None, True
+
+        if executor is not None:
+            executor.shutdown(wait, **kwargs)
+
+
+# }}}
+# CLUSTERS {{{
+Address = Tuple[str, int]
+
+
+def _call(payload: bytes) -> Any:
+    """Unpickle then call a task of a coordinator (in a worker)."""
+    f, args, kwargs = pickle.loads(payload)
+
+    return f(*args, **kwargs)
+
+
+def _handle(
+    conn: connection.Connection, executor: futures.Executor, heartbeat: float
+) -> None:
+    """Execute the tasks received on conn and send back their results."""
+    lock = threading.Lock()
+    closed = threading.Event()
+
+    def beat() -> None:
+        # tell the coordinator the daemon is alive, even while tasks run
+        while not closed.wait(heartbeat):
+            with lock:
+                try:
+                    conn.send((None, True, None))
+                except (OSError, ValueError):
+                    return
+
+    def reply(key: int, task: futures.Future) -> None:
+        try:
+            message = (key, True, task.result())
+        except BaseException as error:
+            message = (key, False, error)
+
+        with lock, contextlib.suppress(OSError, ValueError):
+            try:
+                conn.send(message)
+            except Exception as error:  # unpicklable result or exception
+                conn.send((key, False, RuntimeError(repr(error))))
+
+    threading.Thread(target=beat, daemon=True).start()
+
+    with conn:
+        while True:
+            try:
+                key, payload = conn.recv()
+            except (EOFError, OSError):
+                closed.set()
+                return
+
+            task = executor.submit(_call, payload)
+            task.add_done_callback(functools.partial(reply, key))
+
+
+def serve(
+    address: Address,
+    authkey: bytes,
+    workers: int = None,
+    pool: Type[futures.Executor] = ProcessPool,
+    ready: Callable[[Address], Any] = None,
+    heartbeat: float = 1.0,
+) -> None:
+    """Run a worker daemon executing the tasks of coordinators (see Cluster).
+
+    Tasks are unpickled from the network: only serve on trusted networks,
+    with a secret authkey. Functions must be importable by the daemon.
+    Once listening, ready is called with the address (e.g. for port 0).
+    Every heartbeat seconds, the daemon signals it is alive to coordinators.
+    """
+    # start the workers before listening: forked processes must not inherit
+    # the sockets, or they would keep them open after a crash of the daemon
+    with Session(pool, workers) as executor:
+        executor.start()
+
+        with connection.Listener(address, authkey=authkey) as listener:
+            if ready is not None:
+                ready(listener.address)
+
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, connection.AuthenticationError):
+                    continue
+
+                args = (conn, executor, heartbeat)
+                threading.Thread(target=_handle, args=args, daemon=True).start()
+
+
+class _Job:
+    """Task of a coordinator waiting for (or running on) a worker daemon."""
+
+    def __init__(self, future: futures.Future, payload: bytes, prefer: Any):
+        self.future = future
+        self.payload = payload
+        self.prefer = prefer
+        self.started = False
+        self.attempts = 0
+
+
+class _Worker:
+    """Connection of a coordinator to a worker daemon."""
+
+    def __init__(self, address: Address):
+        self.address = address
+        self.conn: Optional[connection.Connection] = None
+        self.jobs: Dict[int, _Job] = {}
+        self.lock = threading.Lock()
+        self.retry = 0.0
+        self.connecting = False
+
+    def __repr__(self) -> str:
+        return "_Worker({!r})".format(self.address)
+
+    def near(self, prefer: Any) -> bool:
+        """Return True if the worker matches an address or a host."""
+        return prefer in (self.address, self.address[0])
+
+
+class Cluster(futures.Executor):
+    """Executor scheduling tasks on worker daemons over sockets (see serve).
+
+    Each daemon runs at most capacity tasks of the cluster at a time. If
+    locate is set, it is called with the arguments of each task (or of the
+    first item of a pp chunk) and returns the address or host to prefer
+    when it has a free slot (data locality). Tasks of a lost daemon are
+    retried on the others up to retries times, and lost daemons are
+    reconnected after delay seconds. A daemon is lost when its connection
+    breaks or stays silent (no result nor heartbeat) for silence seconds.
+    While no daemon is reachable, each failed connection counts as an
+    attempt of the pending tasks, so they fail rather than wait forever.
+
+    >>> ready: queue.Queue = queue.Queue()
+    >>> for _ in range(2):
+    ...     args = (('localhost', 0), b'secret', 2, ThreadPool, ready.put)
+    ...     threading.Thread(target=serve, args=args, daemon=True).start()
+    >>> addresses = [ready.get(), ready.get()]
+    >>> with Cluster(addresses, b'secret') as c:
+    ...     list(pmap(pow, range(5), range(5), pool=c))
+    ...     sorted(mapreduce(divmod, sum, range(5), [2] * 5, pool=c))
+    [1, 1, 4, 27, 256]
+    [(0, 1), (1, 1), (2, 0)]
+    """
+
+    def __init__(
+        self,
+        addresses: Iterable[Address],
+        authkey: bytes,
+        capacity: int = 4,
+        retries: int = 3,
+        delay: float = 1.0,
+        locate: Callable = None,
+        silence: float = 10.0,
+    ):
+        assert capacity > 0, "capacity must be greater than 0"
+        assert silence > 0, "silence must be greater than 0"
+
+        self.workers = [_Worker(tuple(a)) for a in addresses]  # type: ignore
+        self.authkey = authkey
+        self.capacity = capacity
+        self.retries = retries
+        self.delay = delay
+        self.locate = locate
+        self.silence = silence
+        self._keys = itertools.count()
+        self._pending: Deque[_Job] = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, f, *args, **kwargs) -> futures.Future:  # type: ignore
+        """Schedule f(*args, **kwargs) on a worker daemon."""
+        payload = pickle.dumps((f, args, kwargs))
+        prefer = None
+
+        if self.locate is not None:
+            # pp primitives submit chunks of items: locate their first item
+            hint = args[2][0] if f is _timed else args
+            prefer = self.locate(*hint)
+
+        job = _Job(futures.Future(), payload, prefer)
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+            self._pending.append(job)
+            self._cond.notify_all()
+
+        return job.future
+
+    def map(  # type: ignore
+        self, f, *ls, timeout: float = None, chunksize: Optional[int] = 1
+    ) -> Iterator:
+        """Map f on ls by chunks of chunksize items (one message per chunk)."""
+        window = 2 * self.capacity * max(len(self.workers), 1)
+
+        return _stream(self, f, ls, window, chunksize, timeout)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """Stop scheduling tasks and close the connections once they are done."""
+        with self._cond:
+            self._closed = True
+
+            if cancel_futures:
+                for job in self._pending:
+                    job.future.cancel()
+
+            self._cond.notify_all()
+
+        if wait:
+            self._dispatcher.join()
+
+    def _choose(self, job: _Job) -> Optional[_Worker]:
+        """Return the worker to run job on (or None if all are busy)."""
+        now = time.monotonic()
+        free = [
+            w
+            for w in self.workers
+            if w.retry <= now and not w.connecting and len(w.jobs) < self.capacity
+        ]
+
+        if not free:
+            return None
+
+        if job.prefer is not None:
+            for worker in free:
+                if worker.near(job.prefer):
+                    return worker
+
+        return min(free, key=lambda w: len(w.jobs))
+
+    def _dispatch(self) -> None:
+        """Send the pending jobs to the workers (in a thread)."""
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed and not self._busy():
+                        self._close()
+                        return
+
+                    worker = self._choose(self._pending[0]) if self._pending else None
+
+                    if worker is not None and worker.conn is None:
+                        # connect in background: a hung daemon may never answer
+                        worker.connecting = True
+                        connect = functools.partial(self._connect, worker)
+                        threading.Thread(target=connect, daemon=True).start()
+                    elif worker is not None:
+                        break
+
+                    self._cond.wait(self.delay)
+
+                job = self._pending.popleft()
+
+                if not job.started:
+                    if not job.future.set_running_or_notify_cancel():
+                        continue
+
+                    job.started = True
+
+                key = next(self._keys)
+                worker.jobs[key] = job
+
+            self._send(worker, key, job)
+
+    def _busy(self) -> bool:
+        """Return True if jobs are pending or running on a worker."""
+        return bool(self._pending) or any(w.jobs for w in self.workers)
+
+    def _close(self) -> None:
+        """Close the connections to the workers."""
+        for worker in self.workers:
+            with worker.lock:
+                if worker.conn is not None:
+                    worker.conn.close()
+                    worker.conn = None
+
+    def _connect(self, worker: _Worker) -> None:
+        """Connect to worker and start receiving its results (in a thread)."""
+        try:
+            conn = connection.Client(worker.address, authkey=self.authkey)
+        except Exception as e:
+            conn, error = None, e
+
+        failed: list = []
+
+        with self._cond:
+            worker.connecting = False
+
+            if conn is None:
+                worker.retry = time.monotonic() + self.delay
+
+                if not any(w.conn is not None or w.connecting for w in self.workers):
+                    # no daemon is reachable: the pending jobs lose an attempt
+                    for job in self._pending:
+                        job.attempts += 1
+
+                    failed = [j for j in self._pending if j.attempts > self.retries]
+                    pending = (j for j in self._pending if j.attempts <= self.retries)
+                    self._pending = collections.deque(pending)
+            elif self._closed and not self._busy():
+                conn.close()
+            else:
+                with worker.lock:
+                    worker.conn = conn
+
+                args = (worker, conn)
+                threading.Thread(target=self._receive, args=args, daemon=True).start()
+
+            self._cond.notify_all()
+
+        if failed:
+            self._abort(failed, error)
+
+    def _send(self, worker: _Worker, key: int, job: _Job) -> None:
+        """Send the job to worker (or retry it if the connection is lost)."""
+        try:
+            with worker.lock:
+                if worker.conn is None:
+                    message = "lost connection to {}".format(worker.address)
+                    raise ConnectionError(message)
+
+                worker.conn.send((key, job.payload))
+        except Exception as error:
+            self._fail(worker, None, error)
+
+    def _receive(self, worker: _Worker, conn: connection.Connection) -> None:
+        """Resolve the futures of the results sent by worker (in a thread)."""
+        while True:
+            try:
+                if not conn.poll(self.silence):
+                    message = "no heartbeat from {} for {}s"
+                    raise TimeoutError(message.format(worker.address, self.silence))
+
+                key, ok, value = conn.recv()
+            except Exception as error:
+                return self._fail(worker, conn, error)
+
+            if key is None:  # heartbeat
+                continue
+
+            with self._cond:
+                job = worker.jobs.pop(key, None)
+                self._cond.notify_all()
+
+            if job is None:
+                continue
+
+            if ok:
+                job.future.set_result(value)
+            else:
+                job.future.set_exception(value)
+
+    def _fail(
+        self, worker: _Worker, conn: Optional[connection.Connection], error: Exception
+    ) -> None:
+        """Retry the jobs of a lost worker on the others (or fail them)."""
+        with worker.lock:
+            if conn is not None and conn is not worker.conn:
+                return  # an older connection, already handled
+
+            if worker.conn is not None:
+                worker.conn.close()
+                worker.conn = None
+
+        failed = []
+
+        with self._cond:
+            worker.retry = time.monotonic() + self.delay
+            jobs = list(worker.jobs.values())
+            worker.jobs.clear()
+
+            for job in jobs:
+                job.attempts += 1
+
+                if job.attempts > self.retries:
+                    failed.append(job)
+                else:
+                    self._pending.appendleft(job)
+
+            self._cond.notify_all()
+
+        self._abort(failed, error)
+
+    @staticmethod
+    def _abort(jobs: Iterable[_Job], error: Exception) -> None:
+        """Fail the jobs that have no attempts left."""
+        for job in jobs:
+            if not job.started and not job.future.set_running_or_notify_cancel():
+                continue  # cancelled while pending
+
+            message = "task failed on {} attempts (last: {!r})"
+            failure = ConnectionError(message.format(job.attempts, error))
+            job.future.set_exception(failure)
+
+
 # }}}
 # PARALLELS {{{
 def pmap(
@@ -19,16 +1153,84 @@ def pmap(
     *ls: Iterable,
     workers: int = None,
     timeout: int = None,
-    chunksize: int = 1,
+    chunksize: Optional[int] = 1,
     pool: Pool = ProcessPool,
+    buffersize: int = None,
+    shared: int = None,
+    speculate: float = None,
 ) -> Iterable:
     """Parallel implementation of map (ordered).
 
+    If buffersize is set, ls are read lazily and at most buffersize
+    chunks are in flight, so memory stays flat whatever the input size.
+
+    If chunksize is None, chunks are sized from the measured timings of
+    the previous tasks toward a target duration (adaptive chunksize).
+
+    If shared is set, buffers (bytes, bytearray, memoryview or array-like)
+    of at least shared bytes are passed through shared memory: f receives
+    read-only memoryviews (valid during the call), and results come back
+    as bytes, bytearray or memoryview copies. Segments are always unlinked.
+
+    If speculate is set (e.g. 0.95), chunks running for longer than this
+    quantile of the recent latencies are submitted again, the first attempt
+    to complete wins and the others are cancelled (f must be idempotent).
+    In this mode, timeout is a deadline for each chunk instead of the map.
+
+    >>> from funpy import op
     >>> list(pmap(pow, range(1, 5), range(1, 6), pool=ThreadPool))
     [1, 4, 27, 256]
+    >>> list(it.take(pmap(op.inc, it.count(), pool=ThreadPool, buffersize=4), 3))
+    [1, 2, 3]
+    >>> list(pmap(op.neg, range(5), pool=ThreadPool, chunksize=None))
+    [0, -1, -2, -3, -4]
+    >>> list(pmap(len, [b'a' * 10, bytearray(20)], pool=ThreadPool, shared=0))
+    [10, 20]
+    >>> list(pmap(op.neg, range(5), pool=ThreadPool, speculate=0.95))
+    [0, -1, -2, -3, -4]
+    """
+    if shared is not None and shared_memory is None:
+        raise RuntimeError("shared memory requires python 3.8 or later")
+
+    assert shared is None or speculate is None, "cannot speculate on shared memory"
+
+    # don't wait for the losing attempts of speculative tasks on exit
+    with _executor(pool, workers, wait=speculate is None) as p:
+        window = buffersize or _window(workers)
+
+        if speculate is not None:
+            yield from _speculate(p, f, ls, window, chunksize, timeout, speculate)
+        elif buffersize is None and chunksize is not None and shared is None:
+            yield from p.map(f, *ls, timeout=timeout, chunksize=chunksize)
+        else:
+            yield from _stream(p, f, ls, window, chunksize, timeout, shared=shared)
+
+
+def upmap(
+    f: Callable,
+    *ls: Iterable,
+    workers: int = None,
+    timeout: int = None,
+    chunksize: Optional[int] = 1,
+    pool: Pool = ProcessPool,
+    buffersize: int = None,
+) -> Iterator[Tuple[int, Any]]:
+    """Parallel implementation of map (unordered).
+
+    Yield (index, result) pairs as soon as tasks complete, with at most
+    buffersize chunks in flight (default: twice the number of workers).
+
+    >>> from funpy import op
+    >>> sorted(upmap(pow, range(1, 5), range(1, 6), pool=ThreadPool))
+    [(0, 1), (1, 4), (2, 27), (3, 256)]
+    >>> [x for _, x in sorted(upmap(op.neg, range(3), pool=ThreadPool))]
+    [0, -1, -2]
     """
-    with pool(max_workers=workers) as p:  # type: ignore
-        yield from p.map(f, *ls, timeout=timeout, chunksize=chunksize)
+    if buffersize is None:
+        buffersize = _window(workers)
+
+    with _executor(pool, workers) as p:
+        yield from _unstream(p, f, ls, buffersize, chunksize, timeout)
 
 
 def mapreduce(
@@ -37,18 +1239,67 @@ def mapreduce(
     *ls: Iterable,
     workers: int = None,
     timeout: int = None,
-    chunksize: int = 1,
+    chunksize: Optional[int] = 1,
     pool: Pool = ProcessPool,
+    combiner: Callable = None,
+    partitions: int = None,
 ) -> Iterable:
     """Parallel implement of map reduce.
 
+    If combiner is set, the values of each key are combined inside each
+    chunk by the workers, then folded as they arrive by the parent, so
+    reducer receives the combined values (combiner must be associative).
+
+    If partitions is set, the pairs are grouped (or combined) by the parent
+    into partitions of keys as they arrive, then each partition is reduced
+    by a single task rather than one task per key (keys are yielded by
+    partition).
+
+    If chunksize is None, chunks of the map phase are sized adaptively.
+    Combining and partitioning need chunks of several items: chunksize=1
+    (the default) is then replaced by adaptive chunks.
+
     >>> def mapper(x): return x % 2, x
     >>> def reducer(xs): return sum(xs)
     >>> list(mapreduce(mapper, reducer, range(5), pool=ThreadPool))
     [(0, 6), (1, 4)]
+    >>> list(mapreduce(mapper, reducer, range(5), pool=ThreadPool, combiner=sum))
+    [(0, 6), (1, 4)]
+    >>> sorted(mapreduce(mapper, reducer, range(5), pool=ThreadPool, partitions=2))
+    [(0, 6), (1, 4)]
     """
-    with pool(max_workers=workers) as p:  # type: ignore
-        mapped = p.map(mapper, *ls, timeout=timeout, chunksize=chunksize)
+    assert partitions is None or partitions > 0, "partitions must be greater than 0"
+
+    if (combiner is not None or partitions is not None) and chunksize == 1:
+        chunksize = None
+
+    with _executor(pool, workers) as p:
+        window = _window(workers)
+
+        if partitions is not None:
+            if combiner is None:
+                pairs = _stream(p, mapper, ls, window, chunksize, timeout)
+            else:
+                combine = functools.partial(_combine, combiner)
+                pairs = _stream(p, mapper, ls, window, chunksize, timeout, combine)
+
+            buckets = _shuffle(partitions, combiner, pairs)
+            tasks = [p.submit(_reduce, reducer, list(b.items())) for b in buckets if b]
+            buckets.clear()
+
+            for task in tasks:
+                yield from task.result(timeout=timeout)
+
+            return
+
+        if combiner is None and chunksize is not None:
+            mapped = p.map(mapper, *ls, timeout=timeout, chunksize=chunksize)
+        elif combiner is None:
+            mapped = _stream(p, mapper, ls, window, chunksize, timeout)
+        else:
+            run = functools.partial(_combine, combiner)
+            mapped = _stream(p, mapper, ls, window, chunksize, timeout, run)
+            mapped = _fold(combiner, mapped)
 
         grouped = it.groupkv(mapped)
 
@@ -57,4 +1308,415 @@ def mapreduce(
         yield from ((k, v.result(timeout=timeout)) for k, v in reduced)
 
 
+def pfilter(
+    p: Callable,
+    l: Iterable,
+    workers: int = None,
+    timeout: int = None,
+    chunksize: Optional[int] = None,
+    pool: Pool = ProcessPool,
+    buffersize: int = None,
+) -> Iterator:
+    """Parallel implementation of filter (ordered).
+
+    Chunks are filtered by the workers, so only kept items are returned.
+    By default, chunks are sized adaptively (see pmap).
+
+    >>> from funpy import op
+    >>> list(pfilter(op.iseven, range(10), pool=ThreadPool))
+    [0, 2, 4, 6, 8]
+    """
+    window = buffersize or _window(workers)
+
+    with _executor(pool, workers) as e:
+        yield from _stream(e, p, (l,), window, chunksize, timeout, _select)
+
+
+_missing = object()
+
+
+def preduce(
+    f: Callable,
+    l: Iterable,
+    initial: Any = _missing,
+    workers: int = None,
+    timeout: int = None,
+    chunksize: Optional[int] = None,
+    pool: Pool = ProcessPool,
+) -> Any:
+    """Parallel implementation of reduce (tree reduction).
+
+    Chunks are reduced by the workers, then partial results are reduced
+    level by level until one remains: f must be associative.
+
+    >>> from funpy import op
+    >>> preduce(op.add, range(10), pool=ThreadPool)
+    45
+    >>> preduce(op.add, range(10), 100, pool=ThreadPool, chunksize=3)
+    145
+    >>> preduce(op.add, [], 0, pool=ThreadPool)
+    0
+    """
+    window = _window(workers)
+
+    with _executor(pool, workers) as e:
+        partials = list(_stream(e, f, (l,), window, chunksize, timeout, _fold1))
+
+        while len(partials) > 1:
+            # one task per worker, then pairwise until a single value remains
+            size = max(2, -(-len(partials) // (window // 2)))
+            level = _stream(e, f, (partials,), window, size, timeout, _fold1)
+            partials = list(level)
+
+    if not partials:
+        if initial is _missing:
+            raise TypeError("preduce() of empty iterable with no initial value")
+
+        return initial
+
+    return partials[0] if initial is _missing else f(initial, partials[0])
+
+
+def psorted(
+    l: Iterable,
+    key: Callable = None,
+    reverse: bool = False,
+    workers: int = None,
+    timeout: int = None,
+    chunksize: Optional[int] = None,
+    pool: Pool = ProcessPool,
+) -> list:
+    """Parallel implementation of sorted (stable).
+
+    Chunks are sorted into runs by the workers, then merged by the parent.
+
+    >>> psorted([3, 1, 2, 5, 4], pool=ThreadPool, chunksize=2)
+    [1, 2, 3, 4, 5]
+    >>> psorted(['bb', 'a', 'cc', 'd'], len, True, pool=ThreadPool, chunksize=1)
+    ['bb', 'cc', 'a', 'd']
+    """
+    window = _window(workers)
+    run = functools.partial(_sortrun, reverse)
+
+    with _executor(pool, workers) as e:
+        runs = list(_stream(e, key, (l,), window, chunksize, timeout, run))
+
+    return list(heapq.merge(*runs, key=key, reverse=reverse))
+
+
+# }}}
+# PIPELINES {{{
+_END = object()
+
+
+class _Stopped(Exception):
+    """Raised in a stage when its pipeline is stopped."""
+
+
+class _Failure:
+    """Exception raised by a stage, forwarded to the next stages."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _put(q: queue.Queue, x: Any, stop: threading.Event) -> None:
+    """Put x in q, waiting while q is full (backpressure) until stop."""
+    while not stop.is_set():
+        try:
+            return q.put(x, timeout=0.1)
+        except queue.Full:
+            pass
+
+    raise _Stopped()
+
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator:
+    """Yield the items of q until the end of the stage or stop."""
+    while not stop.is_set():
+        try:
+            x = q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        if x is _END:
+            return
+
+        if isinstance(x, _Failure):
+            raise x.error
+
+        yield x
+
+    raise _Stopped()
+
+
+class Stage:
+    """Step of a pipeline: map (or filter) f with its own pool and workers.
+
+    Counters of the last run: items (inputs), outputs, seconds and blocked
+    (seconds waiting for the next stage: low for the bottleneck stage).
+    """
+
+    def __init__(
+        self,
+        f: Callable,
+        workers: int = 1,
+        pool: Pool = ThreadPool,
+        chunksize: Optional[int] = 1,
+        filter: bool = False,
+        name: str = None,
+    ):
+        self.f = f
+        self.workers = workers
+        self.pool = pool
+        self.chunksize = chunksize
+        self.filter = filter
+        self.name = name or getattr(f, "__name__", repr(f))
+        self.items = self.outputs = 0
+        self.blocked = 0.0
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return "Stage({!r}, workers={})".format(self.name, self.workers)
+
+    @property
+    def seconds(self) -> float:
+        """Return the duration of the last run (so far)."""
+        if self.start is None:
+            return 0.0
+
+        return (self.end or time.perf_counter()) - self.start
+
+    def count(self, l: Iterable) -> Iterator:
+        """Count the items of l given to the stage."""
+        for x in l:
+            self.items += 1
+            yield x
+
+    def run(self, l: Iterable, out: queue.Queue, stop: threading.Event) -> None:
+        """Put the results of the stage on l in out (in a thread)."""
+        self.items = self.outputs = 0
+        self.blocked = 0.0
+        self.start, self.end = time.perf_counter(), None
+        select = _select if self.filter else _starmap
+        window = _window(self.workers)
+
+        try:
+            with _executor(self.pool, self.workers) as e:
+                results = _stream(
+                    e, self.f, (self.count(l),), window, self.chunksize, None, select
+                )
+
+                with contextlib.closing(results):
+                    for x in results:
+                        blocking = time.perf_counter()
+                        _put(out, x, stop)
+                        self.blocked += time.perf_counter() - blocking
+                        self.outputs += 1
+
+            _put(out, _END, stop)
+        except _Stopped:
+            pass
+        except BaseException as error:
+            with contextlib.suppress(_Stopped):
+                _put(out, _Failure(error), stop)
+        finally:
+            self.end = time.perf_counter()
+
+
+class Pipeline:
+    """Chain of stages running concurrently, linked by bounded queues.
+
+    Each stage has its own pool and workers, and slow stages apply
+    backpressure upstream as soon as buffersize items are waiting.
+
+    >>> from funpy import op
+    >>> pipe = Pipeline(Stage(op.inc, workers=2), Stage(op.iseven, filter=True))
+    >>> list(pipe(range(6)))
+    [2, 4, 6]
+    >>> [(s['name'], s['items'], s['outputs']) for s in pipe.stats()]
+    [('inc', 6, 6), ('iseven', 6, 3)]
+    """
+
+    def __init__(self, *stages: Stage, buffersize: int = 64):
+        assert stages, "a pipeline needs at least one stage"
+        assert buffersize > 0, "buffersize must be greater than 0"
+
+        self.stages = stages
+        self.buffersize = buffersize
+
+    def __call__(self, l: Iterable) -> Iterator:
+        """Yield the results of the stages applied on l (ordered)."""
+        stop = threading.Event()
+        threads = []
+
+        for stage in self.stages:
+            out: queue.Queue = queue.Queue(self.buffersize)
+            thread = threading.Thread(
+                target=stage.run, args=(l, out, stop), name=stage.name, daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+            l = _drain(out, stop)
+
+        try:
+            yield from l
+        finally:
+            stop.set()
+
+            for thread in threads:
+                thread.join()
+
+    def stats(self) -> list:
+        """Return the counters and throughput (items/s) of each stage."""
+        return [
+            dict(
+                name=s.name,
+                workers=s.workers,
+                items=s.items,
+                outputs=s.outputs,
+                seconds=s.seconds,
+                blocked=s.blocked,
+                throughput=s.items / s.seconds if s.seconds else 0.0,
+            )
+            for s in self.stages
+        ]
+
+
+# }}}
+# ASYNCHRONOUS {{{
+async def _aiter(l: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    """Iterate over l whether it is synchronous or asynchronous."""
+    if isinstance(l, AsyncIterable):
+        async for x in l:
+            yield x
+    else:
+        for x in l:
+            yield x
+
+
+async def _azip(*ls: Union[Iterable, AsyncIterable]) -> AsyncIterator[tuple]:
+    """Zip synchronous and asynchronous iterables."""
+    its = [_aiter(l).__aiter__() for l in ls]
+
+    while True:
+        try:
+            yield tuple([await x.__anext__() for x in its])
+        except StopAsyncIteration:
+            return
+
+
+async def _acall(f: Callable, args: tuple) -> Any:
+    """Call f with args and await the result if needed."""
+    res = f(*args)
+
+    if inspect.isawaitable(res):
+        res = await res
+
+    return res
+
+
+async def apmap(
+    f: Callable, *ls: Union[Iterable, AsyncIterable], limit: int = 64
+) -> AsyncIterator:
+    """Asynchronous implementation of map (ordered).
+
+    f can be a coroutine function and ls asynchronous iterables. At most
+    limit calls are running concurrently and ls are read lazily.
+
+    >>> async def double(x): return 2 * x
+    >>> async def main(): return [x async for x in apmap(double, range(3))]
+    >>> asyncio.run(main())
+    [0, 2, 4]
+    """
+    assert limit > 0, "limit must be greater than 0"
+
+    tasks: Deque[asyncio.Future] = collections.deque()
+
+    try:
+        async for args in _azip(*ls):
+            tasks.append(asyncio.ensure_future(_acall(f, args)))
+
+            if len(tasks) >= limit:
+                yield await tasks.popleft()
+
+        while tasks:
+            yield await tasks.popleft()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def aupmap(
+    f: Callable, *ls: Union[Iterable, AsyncIterable], limit: int = 64
+) -> AsyncIterator[Tuple[int, Any]]:
+    """Asynchronous implementation of map (unordered).
+
+    Yield (index, result) pairs as soon as calls complete, with at most
+    limit calls running concurrently.
+
+    >>> async def wait(x):
+    ...     await asyncio.sleep(x / 100)
+    ...     return x
+    >>> async def main(): return [x async for x in aupmap(wait, (2, 1, 0))]
+    >>> asyncio.run(main())
+    [(2, 0), (1, 1), (0, 2)]
+    """
+    assert limit > 0, "limit must be greater than 0"
+
+    args = _azip(*ls).__aiter__()
+    done: asyncio.Queue = asyncio.Queue()
+    tasks: Dict[asyncio.Future, int] = {}
+    i, exhausted = 0, False
+
+    try:
+        while True:
+            while not exhausted and len(tasks) < limit:
+                try:
+                    x = await args.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                else:
+                    task = asyncio.ensure_future(_acall(f, x))
+                    task.add_done_callback(done.put_nowait)
+                    tasks[task] = i
+                    i += 1
+
+            if not tasks:
+                return
+
+            finished = await done.get()
+
+            yield tasks.pop(finished), finished.result()
+    finally:
+        for pending in tasks:
+            pending.cancel()
+
+
+async def amapreduce(
+    mapper: Callable,
+    reducer: Callable,
+    *ls: Union[Iterable, AsyncIterable],
+    limit: int = 64,
+) -> AsyncIterator[tuple]:
+    """Asynchronous implementation of map reduce.
+
+    >>> async def mapper(x): return x % 2, x
+    >>> async def reducer(xs): return sum(xs)
+    >>> async def main():
+    ...     return [x async for x in amapreduce(mapper, reducer, range(5))]
+    >>> asyncio.run(main())
+    [(0, 6), (1, 4)]
+    """
+    mapped = [kv async for kv in apmap(mapper, *ls, limit=limit)]
+
+    grouped = list(it.groupkv(mapped))
+
+    keys = iter([k for k, _ in grouped])
+
+    async for v in apmap(reducer, [vs for _, vs in grouped], limit=limit):
+        yield next(keys), v
+
+
 # }}}
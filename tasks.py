@@ -19,6 +19,13 @@ def test(c):
     c.run('venv/bin/pytest {}'.format(META["name"]))
 
 
+@task(venv)
+def bench(c):
+    """Benchmark the backends and iterators of the project."""
+    c.run('venv/bin/python benchmarks/backends.py')
+    c.run('venv/bin/python benchmarks/iterators.py')
+
+
 @task(venv)
 def type(c):
     """Verify the types of the project."""